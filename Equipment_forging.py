@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 
+from cost_table_editor import render_cost_table_editor
+
 # 设置页面配置
 st.set_page_config(
     page_title="装备锻造消耗计算器",
@@ -21,22 +23,44 @@ st.info(
     5、步头甲16  弓臂鞋16
     """
 )
+# 等级上限（开放更高等级时只需修改这里，计算耗时不随上限增加）
+FORGE_MAX_LEVEL = 20
+EXCLUSIVE_WEAPON_MAX_LEVEL = 10
+
+# 锻造消耗规则
+# 1. 锻造石消耗：第1级50，后面每级增加50
+# 2. 金色装备消耗：10级升11级消耗1件，后面每级增加1件
+FORGE_STONES_PER_LEVEL = 50
+GOLDEN_EQUIPMENT_FREE_LEVEL = 10
+# 专武升级消耗：第n级消耗50*n个碎片
+EXCLUSIVE_FRAGMENTS_PER_LEVEL = 50
+
+FORGE_MATERIALS = ("stones", "golden_equipments")
+
+def triangular_number(n):
+    """1+2+...+n，n<=0时为0"""
+    return n * (n + 1) // 2 if n > 0 else 0
+
+def forge_prefix_cost(level):
+    """0级升到level级的累计消耗 (锻造石, 金色装备)，闭式公式 O(1)"""
+    return (
+        FORGE_STONES_PER_LEVEL * triangular_number(level),
+        triangular_number(level - GOLDEN_EQUIPMENT_FREE_LEVEL)
+    )
+
+def exclusive_weapon_prefix_cost(level):
+    """0级升到level级的专武碎片累计消耗，闭式公式 O(1)"""
+    return EXCLUSIVE_FRAGMENTS_PER_LEVEL * triangular_number(level)
+
 # 初始化session_state
 if 'forge_cost_table' not in st.session_state:
-    # 根据新规则动态生成消耗表 - 0-20级，每级消耗[锻造石, 金色装备]
-    # 规则：
-    # 1. 锻造石消耗：第1级50，后面每级增加50
-    # 2. 金色装备消耗：10级升11级消耗1件，后面每级增加1件
+    # 每级消耗[锻造石, 金色装备]，由相邻两级的累计消耗相减得到，作为消耗表调整的默认值
     st.session_state.forge_cost_table = [[0, 0]]  # 0级占位
     
-    for level in range(1, 21):
-        # 锻造石消耗：50 * level
-        stones = 50 * level
-        
-        # 金色装备消耗：level>10时，消耗(level-10)件
-        golden_equipments = max(0, level - 10)
-        
-        st.session_state.forge_cost_table.append([stones, golden_equipments])
+    for level in range(1, FORGE_MAX_LEVEL + 1):
+        high_stones, high_equipments = forge_prefix_cost(level)
+        low_stones, low_equipments = forge_prefix_cost(level - 1)
+        st.session_state.forge_cost_table.append([high_stones - low_stones, high_equipments - low_equipments])
 
 if 'equipment_types' not in st.session_state:
     st.session_state.equipment_types = ["头盔", "铠甲", "臂甲", "战靴"]
@@ -51,14 +75,20 @@ def calculate_exclusive_weapon_cost(current_level, target_level):
     if current_level >= target_level:
         return 0
     
-    total_fragments = 0
-    
-    # 从当前等级+1到目标等级，每级消耗增加50
+    return exclusive_weapon_prefix_cost(target_level) - exclusive_weapon_prefix_cost(current_level)
+
+def exclusive_weapon_cost_series(current_level, target_level):
+    """一次遍历生成每一级的单级消耗和累计消耗，供详情表格和趋势图共用"""
+    base = exclusive_weapon_prefix_cost(current_level)
+    series = []
     for level in range(current_level + 1, target_level + 1):
-        # 第n级需要消耗50*n个碎片
-        total_fragments += 50 * level
-    
-    return total_fragments
+        cumulative = exclusive_weapon_prefix_cost(level) - base
+        series.append({
+            "等级": level,
+            "单级消耗": EXCLUSIVE_FRAGMENTS_PER_LEVEL * level,
+            "累计消耗": cumulative
+        })
+    return series
 
 # 装备锻造消耗函数
 def calculate_cost(current_level, target_level):
@@ -66,15 +96,14 @@ def calculate_cost(current_level, target_level):
     if current_level >= target_level:
         return 0, 0
     
-    total_stones = 0
-    total_equipments = 0
-    
-    # 累加从当前等级到目标等级前一级的所有消耗
-    for level in range(current_level + 1, target_level + 1):
-        total_stones += st.session_state.forge_cost_table[level][0]
-        total_equipments += st.session_state.forge_cost_table[level][1]
+    # 页面中修改过消耗表时使用当前会话的树状数组表（O(log n)），否则直接套用闭式公式
+    forge_table = st.session_state.get("forge_cost_fenwick")
+    if forge_table is not None:
+        return forge_table.range_cost(current_level, target_level)
     
-    return total_stones, total_equipments
+    high_stones, high_equipments = forge_prefix_cost(target_level)
+    low_stones, low_equipments = forge_prefix_cost(current_level)
+    return high_stones - low_stones, high_equipments - low_equipments
 
 # 在顶部添加计算模式选项
 st.header("选择计算模式")
@@ -105,7 +134,7 @@ with tab1:
         with col2:
             equipment["当前等级"] = st.selectbox(
                 f"当前等级 {i+1}",
-                options=list(range(0, 20)),  # 0-19
+                options=list(range(0, FORGE_MAX_LEVEL)),  # 0-19
                 index=equipment["当前等级"],  # 默认为0
                 key=f"current_{i}"
             )
@@ -113,7 +142,7 @@ with tab1:
         with col3:
             equipment["目标等级"] = st.selectbox(
                 f"目标等级 {i+1}",
-                options=list(range(0, 21)),  # 0-20
+                options=list(range(0, FORGE_MAX_LEVEL + 1)),  # 0-20
                 index=equipment["目标等级"],  # 默认为0
                 key=f"target_{i}"
             )
@@ -223,38 +252,23 @@ with tab2:
     - **金色装备消耗**：10级升11级消耗1件，后面每级增加1件
     """)
     
-    # 准备数据框
-    cost_data = []
-    for level in range(1, 21):
-        stones, equipments = st.session_state.forge_cost_table[level]
-        
-        cost_data.append({
-            "等级": level,
-            "锻造石": stones,
-            "金色装备": equipments
-        })
-    
-    df = pd.DataFrame(cost_data)
-    
-    # 显示数据表
-    st.dataframe(
-        df,
-        column_config={
-            "等级": st.column_config.NumberColumn("等级"),
-            "锻造石": st.column_config.NumberColumn("锻造石"),
-            "金色装备": st.column_config.NumberColumn("金色装备")
-        },
-        hide_index=True,
-        use_container_width=True
+    # 每级消耗表，游戏版本更新后可直接修改（只影响当前会话）
+    st.caption("游戏版本更新后可直接修改下表中的数字，修改只影响当前会话")
+    render_cost_table_editor(
+        "forge_cost_fenwick",
+        st.session_state.forge_cost_table[1:],
+        FORGE_MATERIALS,
+        ["锻造石", "金色装备"],
+        range(1, FORGE_MAX_LEVEL + 1)
     )
 
 with tab3:
     st.header("🗡️ 专武升级")
     
     # 专武升级说明
-    st.markdown("""
+    st.markdown(f"""
     ### 专武升级规则
-    - 专武等级范围：0级到10级
+    - 专武等级范围：0级到{EXCLUSIVE_WEAPON_MAX_LEVEL}级
     - 升级消耗：第1级消耗50，后面每级增加50
     """)
     
@@ -266,7 +280,7 @@ with tab3:
     with col_weapon1:
         exclusive_current_level = st.selectbox(
             "当前等级",
-            options=list(range(0, 11)),  # 0-10
+            options=list(range(0, EXCLUSIVE_WEAPON_MAX_LEVEL + 1)),  # 0-10
             index=0,  # 默认为0
             key="exclusive_current"
         )
@@ -274,7 +288,7 @@ with tab3:
     with col_weapon2:
         exclusive_target_level = st.selectbox(
             "目标等级",
-            options=list(range(0, 11)),  # 0-10
+            options=list(range(0, EXCLUSIVE_WEAPON_MAX_LEVEL + 1)),  # 0-10
             index=0,  # 默认为0
             key="exclusive_target"
         )
@@ -311,13 +325,16 @@ with tab3:
         # 显示各级消耗详情
         st.subheader("各级消耗详情")
         
-        detail_data = []
-        for level in range(st.session_state.exclusive_current + 1, st.session_state.exclusive_target + 1):
-            fragments_needed = 50 * level
-            detail_data.append({
-                "升级区间": f"{level-1} → {level}",
-                "所需碎片": fragments_needed
-            })
+        # 单级消耗和累计消耗一次生成，表格和趋势图共用
+        cost_series = exclusive_weapon_cost_series(
+            st.session_state.exclusive_current,
+            st.session_state.exclusive_target
+        )
+        
+        detail_data = [
+            {"升级区间": f"{row['等级']-1} → {row['等级']}", "所需碎片": row["单级消耗"]}
+            for row in cost_series
+        ]
         
         detail_df = pd.DataFrame(detail_data)
         st.dataframe(
@@ -333,19 +350,8 @@ with tab3:
         # 显示累计消耗图
         st.subheader("累计消耗趋势")
         
-        cumulative_data = []
-        cumulative_fragments = 0
-        for level in range(st.session_state.exclusive_current + 1, st.session_state.exclusive_target + 1):
-            fragments_needed = 50 * level
-            cumulative_fragments += fragments_needed
-            cumulative_data.append({
-                "等级": level,
-                "单级消耗": fragments_needed,
-                "累计消耗": cumulative_fragments
-            })
-        
-        if cumulative_data:
-            cumulative_df = pd.DataFrame(cumulative_data).set_index("等级")
+        if cost_series:
+            cumulative_df = pd.DataFrame(cost_series).set_index("等级")
             st.line_chart(cumulative_df[["单级消耗", "累计消耗"]])
 
 # 底部信息
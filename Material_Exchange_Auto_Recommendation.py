@@ -1,15 +1,34 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+
+import altair as alt
 import streamlit as st
 import pandas as pd
 
+from cost_table_editor import render_upgrade_cost_editors
+from level_catalog import WEAPON_LEVEL_NAMES, JADE_LEVEL_OPTIONS, weapon_level_name
+from budget_curve import build_budget_curve
+from parameter_sweep import sweep_settings
+from upgrade_calculator import ResourceSettings
+from upgrade_planner import (
+    ALL_TROOPS, WEAPON_KIND, RecommendationInputs, UpgradePlan,
+    build_group_names, build_plan_result, build_upgrade_groups, find_exact_levels, iter_max_levels
+)
+
+# 兵种在组件 key 中使用的英文名（步兵/弓兵沿用原来的 key）
+TROOP_KEYS = {"步兵": "foot", "骑兵": "cavalry", "弓兵": "archer"}
+# 非基准兵种默认比基准兵种低的 (神兵级数, 玉石级数)
+DEFAULT_LEVEL_DIFFS = {"骑兵": (5, 2), "弓兵": (5, 2)}
+
 # ============= Streamlit 网页应用 =============
 #材料自动兑换计算-Material Exchange Auto-Recommendation
 st.set_page_config(page_title="神兵玉石自动升级计算器", layout="wide")
 st.title("⚔️💎 神兵玉石自动升级计算器")
 st.info("""
 1、点击左上角双箭头填写积分和材料数量  
-2、选择步兵比弓兵神兵玉石高多少级（默认神兵5级玉石2级）  
+2、选择参与规划的兵种，以及步兵比其他兵种神兵玉石高多少级（默认神兵5级玉石2级）  
 3、设置玉石等级是神兵等级百分比（默认40%）  
-4、选择目前步兵弓兵上下神兵玉石等级  
+4、选择目前各兵种上下神兵玉石等级  
 5、点击计算得到结果  
 """)
 st.markdown("---")
@@ -49,28 +68,50 @@ with st.sidebar:
     POINTS_PER_CARVING_KNIFE = st.number_input("琢玉刀兑换比例", min_value=0.0, value=30.0, step=1.0, format="%.2f")
     POINTS_PER_UNPOLISHED_JADE = st.number_input("璞玉兑换比例", min_value=0.0, value=6.0, step=0.1, format="%.2f")
     
+    st.subheader("参与规划的兵种")
+    selected_troops = st.multiselect(
+        "参与规划的兵种",
+        options=ALL_TROOPS,
+        default=["步兵", "弓兵"],
+        help="排在最前面的兵种为基准，其他兵种按下面的等级差比基准兵种低"
+    )
+    # 按固定顺序排列，等级相同时的升级顺序不随选择顺序变化
+    PLAN_TROOPS = tuple(troop for troop in ALL_TROOPS if troop in selected_troops)
+    if not PLAN_TROOPS:
+        st.error("请至少选择一个兵种")
+        st.stop()
+    BASE_TROOP = PLAN_TROOPS[0]
+    
     st.subheader("等级差设置")
-    st.caption("步兵等级比弓兵高多少级？")
+    if len(PLAN_TROOPS) > 1:
+        st.caption(f"{BASE_TROOP}等级比其他兵种高多少级？")
     
-    col1, col2 = st.columns(2)
-    with col1:
-        WEAPON_LEVEL_DIFF = st.number_input(
-            "神兵等级差", 
-            min_value=0, 
-            max_value=10, 
-            value=5, 
-            step=1,
-            help="步兵神兵比弓兵神兵高的级数"
-        )
-    with col2:
-        JADE_LEVEL_DIFF = st.number_input(
-            "玉石等级差", 
-            min_value=0, 
-            max_value=10, 
-            value=2, 
-            step=1,
-            help="步兵玉石比弓兵玉石高的级数"
-        )
+    # 每个兵种计算归一化等级时加上的等级差（基准兵种为 0）
+    WEAPON_LEVEL_OFFSETS = [0]
+    JADE_LEVEL_OFFSETS = [0]
+    for troop in PLAN_TROOPS[1:]:
+        default_weapon_diff, default_jade_diff = DEFAULT_LEVEL_DIFFS.get(troop, (0, 0))
+        col1, col2 = st.columns(2)
+        with col1:
+            WEAPON_LEVEL_OFFSETS.append(st.number_input(
+                f"{troop}神兵等级差", 
+                min_value=0, 
+                max_value=10, 
+                value=default_weapon_diff, 
+                step=1,
+                key=f"weapon_level_diff_{TROOP_KEYS[troop]}",
+                help=f"{BASE_TROOP}神兵比{troop}神兵高的级数"
+            ))
+        with col2:
+            JADE_LEVEL_OFFSETS.append(st.number_input(
+                f"{troop}玉石等级差", 
+                min_value=0, 
+                max_value=10, 
+                value=default_jade_diff, 
+                step=1,
+                key=f"jade_level_diff_{TROOP_KEYS[troop]}",
+                help=f"{BASE_TROOP}玉石比{troop}玉石高的级数"
+            ))
     
     st.subheader("神兵玉石平衡设置")
     JADE_PERCENTAGE = st.number_input(
@@ -92,761 +133,318 @@ JADES = {}    # 存储玉石数据
 
 if version == "详细版 (分别设置上下)":
     st.header("🎯 当前等级设置 - 详细版")
-    st.caption("分别设置步兵和弓兵的神兵上下、玉石上下各4个")
+    st.caption("分别设置各兵种的神兵上下、玉石上下各4个")
     
-    # 定义等级选项
-    weapon_level_options = ["未拥有"] + [f"绿色{i}级" for i in range(1, 6)] + [f"蓝色{i}级" for i in range(1, 6)] + [f"紫色{i}级" for i in range(1, 11)] + [f"红色{i}级" for i in range(1, 31)]
-    jade_level_options = list(range(0, 26))
+    # 等级选项（等级目录中预先构建好的元组）
+    weapon_level_options = WEAPON_LEVEL_NAMES
+    jade_level_options = JADE_LEVEL_OPTIONS
     
     # --- 神兵设置 ---
     st.subheader("⚔️ 神兵设置")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("**步兵神兵**")
-        foot_weapon_up = st.selectbox("步兵上", options=weapon_level_options, 
-                                      index=weapon_level_options.index("未拥有"), key="foot_weapon_up")
-        foot_weapon_down = st.selectbox("步兵下", options=weapon_level_options, 
-                                        index=weapon_level_options.index("未拥有"), key="foot_weapon_down")
-        
-        # 存储到WEAPONS字典
-        WEAPONS["步兵上"] = {"current": foot_weapon_up, "type": "foot"}
-        WEAPONS["步兵下"] = {"current": foot_weapon_down, "type": "foot"}
-    
-    with col2:
-        st.markdown("**弓兵神兵**")
-        archer_weapon_up = st.selectbox("弓兵上", options=weapon_level_options, 
-                                        index=weapon_level_options.index("未拥有"), key="archer_weapon_up")
-        archer_weapon_down = st.selectbox("弓兵下", options=weapon_level_options, 
-                                          index=weapon_level_options.index("未拥有"), key="archer_weapon_down")
-        
-        # 存储到WEAPONS字典
-        WEAPONS["弓兵上"] = {"current": archer_weapon_up, "type": "archer"}
-        WEAPONS["弓兵下"] = {"current": archer_weapon_down, "type": "archer"}
+    weapon_cols = st.columns(len(PLAN_TROOPS))
     
-    st.markdown("---")
+    for col, troop in zip(weapon_cols, PLAN_TROOPS):
+        troop_key = TROOP_KEYS[troop]
+        with col:
+            st.markdown(f"**{troop}神兵**")
+            for position, position_key in (("上", "up"), ("下", "down")):
+                level = st.selectbox(f"{troop}{position}", options=weapon_level_options, 
+                                     index=weapon_level_options.index("未拥有"), key=f"{troop_key}_weapon_{position_key}")
+                WEAPONS[f"{troop}{position}"] = {"current": level, "type": troop_key}
     
     # --- 玉石设置 ---
     st.subheader("💎 玉石设置")
     st.caption("每个兵种的玉石上下各4个，共8个")
     
-    # 步兵玉石
-    with st.expander("步兵玉石 (上下各4个，共8个)", expanded=True):
-        st.markdown("**步兵玉石 - 上位置 (1-4号)**")
-        foot_jade_up_cols = st.columns(4)
-        foot_jade_up_levels = []
-        for i in range(4):
-            with foot_jade_up_cols[i]:
-                level = st.selectbox(f"上{i+1}", options=jade_level_options, index=0, 
-                                    key=f"foot_jade_up_{i}")
-                foot_jade_up_levels.append(level)
-                JADES[f"步兵上{i+1}"] = {"current": level, "type": "foot"}
-        
-        st.markdown("**步兵玉石 - 下位置 (1-4号)**")
-        foot_jade_down_cols = st.columns(4)
-        foot_jade_down_levels = []
-        for i in range(4):
-            with foot_jade_down_cols[i]:
-                level = st.selectbox(f"下{i+1}", options=jade_level_options, index=0, 
-                                    key=f"foot_jade_down_{i}")
-                foot_jade_down_levels.append(level)
-                JADES[f"步兵下{i+1}"] = {"current": level, "type": "foot"}
-    
-    # 弓兵玉石
-    with st.expander("弓兵玉石 (上下各4个，共8个)", expanded=False):
-        st.markdown("**弓兵玉石 - 上位置 (1-4号)**")
-        archer_jade_up_cols = st.columns(4)
-        archer_jade_up_levels = []
-        for i in range(4):
-            with archer_jade_up_cols[i]:
-                level = st.selectbox(f"上{i+1}", options=jade_level_options, index=0, 
-                                    key=f"archer_jade_up_{i}")
-                archer_jade_up_levels.append(level)
-                JADES[f"弓兵上{i+1}"] = {"current": level, "type": "archer"}
-        
-        st.markdown("**弓兵玉石 - 下位置 (1-4号)**")
-        archer_jade_down_cols = st.columns(4)
-        archer_jade_down_levels = []
-        for i in range(4):
-            with archer_jade_down_cols[i]:
-                level = st.selectbox(f"下{i+1}", options=jade_level_options, index=0, 
-                                    key=f"archer_jade_down_{i}")
-                archer_jade_down_levels.append(level)
-                JADES[f"弓兵下{i+1}"] = {"current": level, "type": "archer"}
+    for troop_idx, troop in enumerate(PLAN_TROOPS):
+        troop_key = TROOP_KEYS[troop]
+        with st.expander(f"{troop}玉石 (上下各4个，共8个)", expanded=troop_idx == 0):
+            for position, position_key in (("上", "up"), ("下", "down")):
+                st.markdown(f"**{troop}玉石 - {position}位置 (1-4号)**")
+                jade_cols = st.columns(4)
+                for i in range(4):
+                    with jade_cols[i]:
+                        level = st.selectbox(f"{position}{i+1}", options=jade_level_options, index=0,
+                                            key=f"{troop_key}_jade_{position_key}_{i}")
+                        JADES[f"{troop}{position}{i+1}"] = {"current": level, "type": troop_key}
 
 else:
     st.header("🎯 当前等级设置 - 简略版")
     st.caption("每个兵种的神兵上下相同，玉石8个相同")
     
-    # 定义等级选项
-    weapon_level_options = ["未拥有"] + [f"绿色{i}级" for i in range(1, 6)] + [f"蓝色{i}级" for i in range(1, 6)] + [f"紫色{i}级" for i in range(1, 11)] + [f"红色{i}级" for i in range(1, 31)]
-    jade_level_options = list(range(0, 26))
+    # 等级选项（等级目录中预先构建好的元组）
+    weapon_level_options = WEAPON_LEVEL_NAMES
+    jade_level_options = JADE_LEVEL_OPTIONS
     
-    col1, col2 = st.columns(2)
+    troop_cols = st.columns(len(PLAN_TROOPS))
     
-    with col1:
-        st.subheader("步兵")
-        foot_weapon = st.selectbox("神兵等级", options=weapon_level_options, 
-                                  index=weapon_level_options.index("未拥有"), key="foot_weapon_simple")
-        foot_jade = st.selectbox("玉石等级", options=jade_level_options, index=0, 
-                                key="foot_jade_simple")
-        
-        # 存储神兵数据（上下相同）
-        WEAPONS["步兵上"] = {"current": foot_weapon, "type": "foot"}
-        WEAPONS["步兵下"] = {"current": foot_weapon, "type": "foot"}
-        
-        # 存储玉石数据（8个相同）
-        for i in range(1, 5):
-            JADES[f"步兵上{i}"] = {"current": foot_jade, "type": "foot"}
-            JADES[f"步兵下{i}"] = {"current": foot_jade, "type": "foot"}
-    
-    with col2:
-        st.subheader("弓兵")
-        archer_weapon = st.selectbox("神兵等级", options=weapon_level_options, 
-                                    index=weapon_level_options.index("未拥有"), key="archer_weapon_simple")
-        archer_jade = st.selectbox("玉石等级", options=jade_level_options, index=0, 
-                                  key="archer_jade_simple")
-        
-        # 存储神兵数据（上下相同）
-        WEAPONS["弓兵上"] = {"current": archer_weapon, "type": "archer"}
-        WEAPONS["弓兵下"] = {"current": archer_weapon, "type": "archer"}
-        
-        # 存储玉石数据（8个相同）
-        for i in range(1, 5):
-            JADES[f"弓兵上{i}"] = {"current": archer_jade, "type": "archer"}
-            JADES[f"弓兵下{i}"] = {"current": archer_jade, "type": "archer"}
+    for col, troop in zip(troop_cols, PLAN_TROOPS):
+        troop_key = TROOP_KEYS[troop]
+        with col:
+            st.subheader(troop)
+            weapon_level = st.selectbox("神兵等级", options=weapon_level_options, 
+                                        index=weapon_level_options.index("未拥有"), key=f"{troop_key}_weapon_simple")
+            jade_level = st.selectbox("玉石等级", options=jade_level_options, index=0, 
+                                      key=f"{troop_key}_jade_simple")
+            
+            # 存储神兵数据（上下相同）
+            WEAPONS[f"{troop}上"] = {"current": weapon_level, "type": troop_key}
+            WEAPONS[f"{troop}下"] = {"current": weapon_level, "type": troop_key}
+            
+            # 存储玉石数据（8个相同）
+            for i in range(1, 5):
+                JADES[f"{troop}上{i}"] = {"current": jade_level, "type": troop_key}
+                JADES[f"{troop}下{i}"] = {"current": jade_level, "type": troop_key}
 
 st.markdown("---")
 
-# --- 3. 核心数据与计算器类 ---
-WEAPON_UPGRADE_COSTS = [
-    [1000, 50, 0], [1500, 75, 0], [2000, 100, 0], [2500, 125, 0], [3000, 150, 0],
-    [3500, 175, 0], [4000, 200, 0], [4500, 225, 0], [5000, 250, 0], [5500, 275, 0],
-    [6000, 300, 150], [6500, 325, 160], [7000, 350, 170], [7500, 375, 180], [8000, 400, 180],
-    [8500, 425, 190], [9000, 450, 200], [9500, 475, 200], [10000, 500, 210], [10500, 525, 220],
-    [11000, 550, 220], [12000, 600, 230], [13000, 650, 250], [14000, 700, 260], [15000, 750, 270],
-    [16000, 800, 280], [17000, 850, 290], [18000, 900, 300], [19000, 950, 300], [20000, 1000, 310],
-    [21000, 1050, 320], [22000, 1100, 320], [23000, 1150, 320], [24000, 1200, 320], [25000, 1250, 330],
-    [26000, 1300, 330], [27000, 1350, 340], [28000, 1400, 350], [29000, 1450, 360], [30000, 1500, 360],
-    [31000, 1550, 360], [32000, 1600, 370], [33000, 1650, 380], [34000, 1700, 390], [35000, 1750, 390],
-    [36000, 1800, 400], [37000, 1850, 410], [38000, 1900, 420], [39000, 1950, 430], [40000, 2000, 440]
-]
-
-JADE_UPGRADE_COSTS = [
-    [2, 10], [4, 12], [6, 14], [8, 16], [10, 18],
-    [12, 20], [16, 24], [20, 28], [30, 32], [40, 36],
-    [60, 50], [100, 60], [140, 70], [180, 80], [220, 90],
-    [240, 100], [240, 140], [260, 180], [260, 220], [280, 260],
-    [300, 300], [320, 340], [340, 380], [360, 420], [380, 460]
-]
-
-class AutoUpgradeCalculator:
-    def __init__(self, version_type, weapons, jades):
-        # 当前资源
-        self.current_points = CURRENT_POINTS
-        self.current_wood = CURRENT_WOOD
-        self.current_mithril = CURRENT_MITHRIL
-        self.current_lapis = CURRENT_LAPIS
-        self.current_carving_knife = CURRENT_CARVING_KNIFE
-        self.current_unpolished_jade = CURRENT_UNPOLISHED_JADE
-        
-        # 兑换比例
-        self.points_per_wood = POINTS_PER_WOOD
-        self.points_per_mithril = POINTS_PER_MITHRIL
-        self.points_per_lapis = POINTS_PER_LAPIS
-        self.points_per_carving_knife = POINTS_PER_CARVING_KNIFE
-        self.points_per_unpolished_jade = POINTS_PER_UNPOLISHED_JADE
-        
-        # 当前等级数据
-        self.weapons = weapons
-        self.jades = jades
-        
-        # 等级差
-        self.weapon_level_diff = WEAPON_LEVEL_DIFF
-        self.jade_level_diff = JADE_LEVEL_DIFF
-        
-        # 玉石百分比设置
-        self.jade_percentage = JADE_PERCENTAGE / 100.0  # 转换为小数
-        
-        # 版本类型
-        self.version_type = version_type
-        
-        # 消耗表
-        self.weapon_upgrade_costs = WEAPON_UPGRADE_COSTS
-        self.jade_upgrade_costs = JADE_UPGRADE_COSTS
+# --- 消耗表调整（游戏版本更新后使用）---
+# 未修改时使用进程共享的默认消耗表，修改后使用当前会话的树状数组表
+WEAPON_COST_TABLE, JADE_COST_TABLE = render_upgrade_cost_editors()
+
+st.markdown("---")
+
+# --- 3. 计算输入：页面上的设置整理成不可变输入，由 upgrade_planner 中的纯函数在后台线程计算 ---
+RECOMMENDATION_INPUTS = RecommendationInputs(
+    resources=ResourceSettings(
+        current_points=CURRENT_POINTS,
+        current_wood=CURRENT_WOOD,
+        current_mithril=CURRENT_MITHRIL,
+        current_lapis=CURRENT_LAPIS,
+        current_carving_knife=CURRENT_CARVING_KNIFE,
+        current_unpolished_jade=CURRENT_UNPOLISHED_JADE,
+        points_per_wood=POINTS_PER_WOOD,
+        points_per_mithril=POINTS_PER_MITHRIL,
+        points_per_lapis=POINTS_PER_LAPIS,
+        points_per_carving_knife=POINTS_PER_CARVING_KNIFE,
+        points_per_unpolished_jade=POINTS_PER_UNPOLISHED_JADE
+    ),
+    weapons=tuple((name, info["current"]) for name, info in WEAPONS.items()),
+    jades=tuple((name, info["current"]) for name, info in JADES.items()),
+    weapon_cost_index=WEAPON_COST_TABLE,
+    jade_cost_index=JADE_COST_TABLE,
+    troops=PLAN_TROOPS,
+    weapon_level_offsets=tuple(WEAPON_LEVEL_OFFSETS),
+    jade_level_offsets=tuple(JADE_LEVEL_OFFSETS),
+    jade_percentage=JADE_PERCENTAGE
+)
+# 规划中的分组（每个兵种一组神兵、一组玉石）和显示名称
+PLAN_GROUPS = build_upgrade_groups(len(PLAN_TROOPS))
+PLAN_GROUP_NAMES = build_group_names(PLAN_TROOPS)
+
+# --- 4. 计算并展示结果 ---
+HISTORY_PAGE_SIZE = 50  # 升级顺序详情每页行数
+JOB_POLL_INTERVAL = 0.5  # 后台计算进行中时刷新进度的间隔（秒）
+
+@st.cache_resource
+def get_recommendation_executor():
+    """所有会话共用的后台计算线程池"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="auto-upgrade")
+
+class RecommendationJob:
+    """
+    提交到后台线程的一次推荐计算，句柄保存在 st.session_state 中，页面定时查询进度和结果
+    停止时设置标志，计算在下一次报告进度时结束：贪心规划返回已经规划好的部分方案（会话规划保持完整，
+    下次计算从这里继续），精确模式返回已找到的最好方案
+    """
     
-    def level_str_to_number(self, level_str):
-        """将颜色等级字符串转换为数字等级"""
-        level_str = level_str.strip()
-        
-        if level_str == "未拥有":
-            return 0
-        
-        if "绿色" in level_str:
-            level_num = int(level_str.replace("绿色", "").replace("级", ""))
-            if 1 <= level_num <= 5:
-                return level_num
-        elif "蓝色" in level_str:
-            level_num = int(level_str.replace("蓝色", "").replace("级", ""))
-            if 1 <= level_num <= 5:
-                return level_num + 5
-        elif "紫色" in level_str:
-            level_num = int(level_str.replace("紫色", "").replace("级", ""))
-            if 1 <= level_num <= 10:
-                return level_num + 10
-        elif "红色" in level_str:
-            level_num = int(level_str.replace("红色", "").replace("级", ""))
-            if 1 <= level_num <= 30:
-                return level_num + 20
-        
-        return 0
+    def __init__(self, settings, inputs, plan, exact_time_limit=None):
+        # settings 为提交时的全部设置，页面重新运行时设置不同则自动取消
+        self.settings = settings
+        self.inputs = inputs
+        self.plan = plan
+        self.exact_time_limit = exact_time_limit
+        self.cancel_event = threading.Event()
+        self.progress = None
+        self.future = get_recommendation_executor().submit(self.run)
     
-    def level_number_to_str(self, level_num):
-        """将数字等级转换为颜色等级字符串"""
-        if level_num == 0:
-            return "未拥有"
-        elif 1 <= level_num <= 5:
-            return f"绿色{level_num}级"
-        elif 6 <= level_num <= 10:
-            return f"蓝色{level_num-5}级"
-        elif 11 <= level_num <= 20:
-            return f"紫色{level_num-10}级"
-        elif 21 <= level_num <= 50:
-            return f"红色{level_num-20}级"
-        else:
-            return "未知等级"
+    def run(self):
+        if self.exact_time_limit is not None:
+            return find_exact_levels(self.inputs, self.exact_time_limit, self.cancel_event)
+        for progress in iter_max_levels(self.inputs, self.plan):
+            self.progress = progress
+            if self.cancel_event.is_set():
+                break
+        return build_plan_result(self.inputs, self.plan)
     
-    def calculate_upgrade_cost(self, current_level, target_level, cost_type="weapon"):
-        """计算从当前等级升级到目标等级所需材料"""
-        if target_level <= current_level:
-            if cost_type == "weapon":
-                return {"wood": 0, "mithril": 0, "lapis": 0}
-            else:
-                return {"knife": 0, "jade": 0}
-        
-        total_cost = {"wood": 0, "mithril": 0, "lapis": 0} if cost_type == "weapon" else {"knife": 0, "jade": 0}
-        
-        for level in range(current_level, target_level):
-            if cost_type == "weapon" and level < len(self.weapon_upgrade_costs):
-                cost_wood, cost_mithril, cost_lapis = self.weapon_upgrade_costs[level]
-                total_cost["wood"] += cost_wood
-                total_cost["mithril"] += cost_mithril
-                total_cost["lapis"] += cost_lapis
-            elif cost_type == "jade" and level < len(self.jade_upgrade_costs):
-                cost_knife, cost_jade = self.jade_upgrade_costs[level]
-                total_cost["knife"] += cost_knife
-                total_cost["jade"] += cost_jade
-        
-        return total_cost
+    @property
+    def stopped(self):
+        return self.cancel_event.is_set()
     
-    def get_min_levels(self, weapon_nums, jade_nums):
-        """获取每个兵种的神兵和玉石最低等级"""
-        # 步兵神兵最低等级
-        foot_weapon_keys = [k for k in weapon_nums.keys() if "步兵" in k]
-        foot_weapon_levels = [weapon_nums[k] for k in foot_weapon_keys]
-        foot_weapon_min = min(foot_weapon_levels) if foot_weapon_levels else 0
-        
-        # 弓兵神兵最低等级
-        archer_weapon_keys = [k for k in weapon_nums.keys() if "弓兵" in k]
-        archer_weapon_levels = [weapon_nums[k] for k in archer_weapon_keys]
-        archer_weapon_min = min(archer_weapon_levels) if archer_weapon_levels else 0
-        
-        # 步兵玉石最低等级
-        foot_jade_keys = [k for k in jade_nums.keys() if "步兵" in k]
-        foot_jade_levels = [jade_nums[k] for k in foot_jade_keys]
-        foot_jade_min = min(foot_jade_levels) if foot_jade_levels else 0
-        
-        # 弓兵玉石最低等级
-        archer_jade_keys = [k for k in jade_nums.keys() if "弓兵" in k]
-        archer_jade_levels = [jade_nums[k] for k in archer_jade_keys]
-        archer_jade_min = min(archer_jade_levels) if archer_jade_levels else 0
-        
-        return {
-            "foot_weapon_min": foot_weapon_min,
-            "archer_weapon_min": archer_weapon_min,
-            "foot_jade_min": foot_jade_min,
-            "archer_jade_min": archer_jade_min
-        }
+    def done(self):
+        return self.future.done()
     
-    def calculate_normalized_levels(self, min_levels):
-        """计算归一化等级（修改后的方法）"""
-        # 将神兵等级转换为等效玉石等级
-        # 公式：等效玉石等级 = 神兵等级 × 百分比
-        foot_weapon_norm = min_levels["foot_weapon_min"] * self.jade_percentage
-        
-        # 弓兵神兵加上等级差
-        archer_weapon_norm = (min_levels["archer_weapon_min"] + self.weapon_level_diff) * self.jade_percentage
-        
-        # 玉石等级直接使用（已经是玉石等级）
-        foot_jade_norm = min_levels["foot_jade_min"]
-        
-        # 弓兵玉石加上等级差
-        archer_jade_norm = min_levels["archer_jade_min"] + self.jade_level_diff
-        
-        return {
-            "foot_weapon_norm": foot_weapon_norm,
-            "archer_weapon_norm": archer_weapon_norm,
-            "foot_jade_norm": foot_jade_norm,
-            "archer_jade_norm": archer_jade_norm
-        }
+    def cancelled(self):
+        """还在排队时就被取消，没有开始计算，也没有结果"""
+        return self.future.cancelled()
     
-    def find_item_to_upgrade(self, weapon_nums, jade_nums, normalized_levels):
-        """根据归一化等级找出需要升级的项目"""
-        # 找到归一化等级最小的项目
-        min_norm = float('inf')
-        upgrade_type = None  # 'foot_weapon_norm', 'archer_weapon_norm', 'foot_jade_norm', 'archer_jade_norm'
-        
-        for norm_type, norm_value in normalized_levels.items():
-            if norm_value < min_norm:
-                min_norm = norm_value
-                upgrade_type = norm_type
-        
-        # 根据项目类型找到具体要升级的物品
-        item_name = None
-        is_weapon = False
-        
-        # 注意：upgrade_type 是 "foot_weapon_norm" 这样的字符串
-        if upgrade_type == "foot_weapon_norm":
-            # 找到步兵中等级最低的神兵
-            foot_weapon_keys = [k for k in weapon_nums.keys() if "步兵" in k]
-            min_level = min([weapon_nums[k] for k in foot_weapon_keys])
-            for k in foot_weapon_keys:
-                if weapon_nums[k] == min_level:
-                    item_name = k
-                    break
-            is_weapon = True
-            
-        elif upgrade_type == "archer_weapon_norm":
-            # 找到弓兵中等级最低的神兵
-            archer_weapon_keys = [k for k in weapon_nums.keys() if "弓兵" in k]
-            min_level = min([weapon_nums[k] for k in archer_weapon_keys])
-            for k in archer_weapon_keys:
-                if weapon_nums[k] == min_level:
-                    item_name = k
-                    break
-            is_weapon = True
-            
-        elif upgrade_type == "foot_jade_norm":
-            # 找到步兵中等级最低的玉石
-            foot_jade_keys = [k for k in jade_nums.keys() if "步兵" in k]
-            min_level = min([jade_nums[k] for k in foot_jade_keys])
-            for k in foot_jade_keys:
-                if jade_nums[k] == min_level:
-                    item_name = k
-                    break
-            is_weapon = False
-            
-        elif upgrade_type == "archer_jade_norm":
-            # 找到弓兵中等级最低的玉石
-            archer_jade_keys = [k for k in jade_nums.keys() if "弓兵" in k]
-            min_level = min([jade_nums[k] for k in archer_jade_keys])
-            for k in archer_jade_keys:
-                if jade_nums[k] == min_level:
-                    item_name = k
-                    break
-            is_weapon = False
-        
-        return item_name, is_weapon, upgrade_type
+    def cancel(self):
+        """
+        停止计算，之后会话规划不会再被修改：还在排队（线程池为所有会话共用）时直接从队列中取消，不等待；
+        已经开始时等待后台线程结束（最多再算 PLAN_PROGRESS_STEPS 级）
+        """
+        self.cancel_event.set()
+        if not self.future.cancel():
+            futures_wait([self.future])
     
-    def find_max_levels(self):
-        """按照新逻辑寻找在当前资源下能达到的最高等级"""
-        # 初始化结果
-        result = {
-            "upgraded": False,
-            "weapon_targets": {},
-            "jade_targets": {},
-            "points_needed": 0,
-            "materials_to_buy": {},
-            "materials_used": {},
-            "materials_needed": {},
-            "points_left": self.current_points
-        }
-        
-        # 初始化当前资源副本
-        points_left = self.current_points
-        current_wood = self.current_wood
-        current_mithril = self.current_mithril
-        current_lapis = self.current_lapis
-        current_carving_knife = self.current_carving_knife
-        current_unpolished_jade = self.current_unpolished_jade
-        
-        # 将当前等级转换为数字并存储
-        weapon_current_nums = {}
-        for weapon_name, weapon_info in self.weapons.items():
-            weapon_current_nums[weapon_name] = self.level_str_to_number(weapon_info["current"])
-        
-        jade_current_nums = {}
-        for jade_name, jade_info in self.jades.items():
-            jade_current_nums[jade_name] = jade_info["current"]
-        
-        # 目标等级初始化为当前等级
-        weapon_target_nums = weapon_current_nums.copy()
-        jade_target_nums = jade_current_nums.copy()
-        
-        # 尝试升级
-        upgraded = False
-        
-        total_points_used = 0  # 总共使用的积分
-        
-        # 记录升级历史
-        upgrade_history = []
-        
-        # 用于记录无法升级的项目类型
-        failed_upgrade_types = set()
-        
-        # 记录使用的库存材料
-        materials_used = {
-            "wood": 0,
-            "mithril": 0,
-            "lapis": 0,
-            "knife": 0,
-            "jade": 0
-        }
-        
-        # 记录需要购买的材料
-        materials_to_buy = {
-            "wood_need_buy": 0,
-            "mithril_need_buy": 0,
-            "lapis_need_buy": 0,
-            "knife_need_buy": 0,
-            "jade_need_buy": 0
-        }
-        
-        # 开始循环升级
-        max_iterations = 100  # 防止无限循环
-        iteration = 0
-        
-        while iteration < max_iterations:
-            iteration += 1
-            
-            # 获取最低等级
-            min_levels = self.get_min_levels(weapon_target_nums, jade_target_nums)
-            
-            # 计算归一化等级
-            normalized_levels = self.calculate_normalized_levels(min_levels)
-            
-            # 排除已经失败的项目类型
-            filtered_norms = {k: v for k, v in normalized_levels.items() if k not in failed_upgrade_types}
-            
-            if not filtered_norms:
-                # 所有项目类型都失败了，退出循环
-                break
-            
-            # 找出需要升级的项目
-            # 我们需要从过滤后的归一化等级中找出最小的
-            min_norm = float('inf')
-            upgrade_type = None
-            for norm_type, norm_value in filtered_norms.items():
-                if norm_value < min_norm:
-                    min_norm = norm_value
-                    upgrade_type = norm_type
-            
-            if upgrade_type is None:
-                # 没有找到可升级的项目
-                break
-            
-            item_name, is_weapon, found_upgrade_type = self.find_item_to_upgrade(
-                weapon_target_nums, jade_target_nums, {upgrade_type: min_norm}
+    def result(self):
+        return self.future.result()
+
+def format_group_level(kind, level):
+    """分组最低等级的显示：神兵为颜色等级，玉石为数字等级"""
+    return weapon_level_name(level) if kind == WEAPON_KIND else f"{level}级"
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def render_job_progress(job):
+    """后台计算进行中：定时刷新进度，可以停止并采用当前方案或取消；计算结束后重新运行页面显示结果"""
+    if job.done():
+        st.rerun()
+    
+    with st.status("正在后台计算最佳升级方案...", expanded=True):
+        progress = job.progress
+        if progress is None:
+            st.write("准备中...")
+        else:
+            group_levels = zip(
+                build_group_names(job.inputs.troops), build_upgrade_groups(len(job.inputs.troops)), progress["min_levels"]
             )
-            
-            if item_name is None:
-                # 没有找到具体的项目，将这个类型标记为失败
-                failed_upgrade_types.add(upgrade_type)
-                continue
-            
-            # 获取当前等级和目标等级
-            if is_weapon:
-                current_num = weapon_target_nums[item_name]
-                target_num = current_num + 1
-                
-                # 检查是否达到最大等级
-                if current_num >= len(self.weapon_upgrade_costs):
-                    # 标记这个类型已达到最大等级
-                    failed_upgrade_types.add(upgrade_type)
-                    continue
-                
-                # 计算升级成本
-                cost = self.calculate_upgrade_cost(current_num, target_num, "weapon")
-            else:
-                current_num = jade_target_nums[item_name]
-                target_num = current_num + 1
-                
-                # 检查是否达到最大等级
-                if current_num >= len(self.jade_upgrade_costs):
-                    # 标记这个类型已达到最大等级
-                    failed_upgrade_types.add(upgrade_type)
-                    continue
-                
-                # 计算升级成本
-                cost = self.calculate_upgrade_cost(current_num, target_num, "jade")
-            
-            # 检查是否有足够的积分来升级（使用当前库存）
-            if is_weapon:
-                # 神兵材料
-                wood_needed = cost.get("wood", 0)
-                mithril_needed = cost.get("mithril", 0)
-                lapis_needed = cost.get("lapis", 0)
-                
-                # 计算需要兑换的材料（使用当前库存）
-                wood_deficit = max(0, wood_needed - current_wood)
-                mithril_deficit = max(0, mithril_needed - current_mithril)
-                lapis_deficit = max(0, lapis_needed - current_lapis)
-                
-                # 计算所需积分
-                points_needed = (
-                    wood_deficit * self.points_per_wood +
-                    mithril_deficit * self.points_per_mithril +
-                    lapis_deficit * self.points_per_lapis
-                )
-                
-                # 检查积分是否足够
-                if points_left < points_needed:
-                    failed_upgrade_types.add(upgrade_type)
-                    continue
-                
-                # 更新库存和积分
-                wood_used = min(current_wood, wood_needed)
-                mithril_used = min(current_mithril, mithril_needed)
-                lapis_used = min(current_lapis, lapis_needed)
-                
-                current_wood -= wood_used
-                current_mithril -= mithril_used
-                current_lapis -= lapis_used
-                
-                # 记录材料使用
-                materials_used["wood"] += wood_used
-                materials_used["mithril"] += mithril_used
-                materials_used["lapis"] += lapis_used
-                
-                # 记录需要购买的材料
-                materials_to_buy["wood_need_buy"] += wood_deficit
-                materials_to_buy["mithril_need_buy"] += mithril_deficit
-                materials_to_buy["lapis_need_buy"] += lapis_deficit
-                
-            else:
-                # 玉石材料
-                knife_needed = cost.get("knife", 0)
-                jade_needed = cost.get("jade", 0)
-                
-                # 计算需要兑换的材料（使用当前库存）
-                knife_deficit = max(0, knife_needed - current_carving_knife)
-                jade_deficit = max(0, jade_needed - current_unpolished_jade)
-                
-                # 计算所需积分
-                points_needed = (
-                    knife_deficit * self.points_per_carving_knife +
-                    jade_deficit * self.points_per_unpolished_jade
-                )
-                
-                # 检查积分是否足够
-                if points_left < points_needed:
-                    failed_upgrade_types.add(upgrade_type)
-                    continue
-                
-                # 更新库存和积分
-                knife_used = min(current_carving_knife, knife_needed)
-                jade_used = min(current_unpolished_jade, jade_needed)
-                
-                current_carving_knife -= knife_used
-                current_unpolished_jade -= jade_used
-                
-                # 记录材料使用
-                materials_used["knife"] += knife_used
-                materials_used["jade"] += jade_used
-                
-                # 记录需要购买的材料
-                materials_to_buy["knife_need_buy"] += knife_deficit
-                materials_to_buy["jade_need_buy"] += jade_deficit
-            
-            # 扣除积分
-            points_left -= points_needed
-            total_points_used += points_needed
-            
-            # 记录升级
-            upgrade_history.append({
-                "item": item_name,
-                "type": "weapon" if is_weapon else "jade",
-                "from_level": current_num,
-                "to_level": target_num,
-                "cost": cost,
-                "points_needed": points_needed
-            })
-            
-            # 更新目标等级
-            if is_weapon:
-                weapon_target_nums[item_name] = target_num
-            else:
-                jade_target_nums[item_name] = target_num
-            
-            upgraded = True
-        
-        if not upgraded:
-            return result
-        
-        # 计算总消耗
-        total_wood_needed = 0
-        total_mithril_needed = 0
-        total_lapis_needed = 0
-        total_knife_needed = 0
-        total_jade_needed = 0
-        
-        # 神兵消耗
-        for weapon_name, current_num in weapon_current_nums.items():
-            target_num = weapon_target_nums[weapon_name]
-            cost = self.calculate_upgrade_cost(current_num, target_num, "weapon")
-            total_wood_needed += cost["wood"]
-            total_mithril_needed += cost["mithril"]
-            total_lapis_needed += cost["lapis"]
-        
-        # 玉石消耗
-        for jade_name, current_num in jade_current_nums.items():
-            target_num = jade_target_nums[jade_name]
-            cost = self.calculate_upgrade_cost(current_num, target_num, "jade")
-            total_knife_needed += cost["knife"]
-            total_jade_needed += cost["jade"]
-        
-        # 合并所有材料需求
-        total_materials_needed = {
-            "wood": total_wood_needed,
-            "mithril": total_mithril_needed,
-            "lapis": total_lapis_needed,
-            "knife": total_knife_needed,
-            "jade": total_jade_needed
-        }
-        
-        # 计算升级后剩余材料
-        materials_left = {
-            "wood": current_wood,
-            "mithril": current_mithril,
-            "lapis": current_lapis,
-            "knife": current_carving_knife,
-            "jade": current_unpolished_jade
-        }
-        
-        # 计算玉石百分比实际值
-        min_levels_final = self.get_min_levels(weapon_target_nums, jade_target_nums)
-        foot_actual_percentage = (min_levels_final["foot_jade_min"] / min_levels_final["foot_weapon_min"] * 100) if min_levels_final["foot_weapon_min"] > 0 else 0
-        archer_actual_percentage = (min_levels_final["archer_jade_min"] / min_levels_final["archer_weapon_min"] * 100) if min_levels_final["archer_weapon_min"] > 0 else 0
-        
-        result = {
-            "upgraded": True,
-            "weapon_targets": weapon_target_nums,
-            "jade_targets": jade_target_nums,
-            "weapon_currents": weapon_current_nums,
-            "jade_currents": jade_current_nums,
-            "points_needed": total_points_used,
-            "materials_to_buy": materials_to_buy,
-            "materials_used": materials_used,
-            "materials_needed": total_materials_needed,
-            "materials_left": materials_left,
-            "points_left": points_left,
-            "foot_weapon_min": min_levels_final["foot_weapon_min"],
-            "archer_weapon_min": min_levels_final["archer_weapon_min"],
-            "foot_jade_min": min_levels_final["foot_jade_min"],
-            "archer_jade_min": min_levels_final["archer_jade_min"],
-            "foot_actual_percentage": foot_actual_percentage,
-            "archer_actual_percentage": archer_actual_percentage,
-            "upgrade_history": upgrade_history
-        }
-        
-        return result
+            st.markdown(
+                f"已规划 **{progress['step_count']}** 级升级，需要积分 **{progress['points_needed']:.1f}**  \n"
+                + "，".join(f"{name} {format_group_level(kind, level)}" for name, (kind, _), level in group_levels)
+            )
+    
+    accept_col, cancel_col = st.columns(2)
+    with accept_col:
+        if st.button("✋ 停止并采用当前方案", key="accept_partial_plan", use_container_width=True):
+            job.cancel()
+            st.rerun()
+    with cancel_col:
+        if st.button("❌ 取消计算", key="cancel_recommendation", use_container_width=True):
+            job.cancel()
+            del st.session_state["recommendation_job"]
+            st.rerun()
+
+@st.fragment
+def render_upgrade_history(upgrade_history):
+    """升级顺序详情分页显示：同一项目连续的升级合并为一行，翻页时只重新运行这一段、只生成当前页"""
+    page_count = (len(upgrade_history) + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = 1
+    if page_count > 1:
+        page = st.number_input("页码", min_value=1, max_value=page_count, value=1, step=1, key="upgrade_history_page")
+    st.dataframe(pd.DataFrame(upgrade_history.page_rows(page - 1, HISTORY_PAGE_SIZE)), use_container_width=True)
+    st.caption(f"共 {upgrade_history.step_count} 级升级，合并为 {len(upgrade_history)} 行，第 {page}/{page_count} 页")
 
-# --- 4. 计算并展示结果 ---
 st.header("🚀 自动升级计算")
 
+exact_col1, exact_col2 = st.columns([2, 1])
+with exact_col1:
+    EXACT_MODE = st.checkbox(
+        "精确模式",
+        value=False,
+        help="贪心方案遇到买不起的一级就停止该类升级，可能剩下积分；精确模式在保持平衡的前提下搜索总升级级数最多的方案"
+    )
+with exact_col2:
+    EXACT_TIME_LIMIT = st.number_input("精确模式搜索时间上限（秒）", min_value=0.5, max_value=30.0, value=3.0, step=0.5,
+                                       disabled=not EXACT_MODE)
+
+# 本次运行的全部设置；与后台计算提交时不同说明用户改了设置
+RECOMMENDATION_SETTINGS = (version, EXACT_MODE, EXACT_TIME_LIMIT, RECOMMENDATION_INPUTS)
+
+job = st.session_state.get("recommendation_job")
+if job is not None and job.settings != RECOMMENDATION_SETTINGS:
+    # 设置已改变：自动取消还在进行的计算，旧结果也不再显示
+    job.cancel()
+    del st.session_state["recommendation_job"]
+    job = None
+
 if st.button("开始自动计算最佳升级方案", type="primary", use_container_width=True):
-    with st.spinner("正在计算最佳升级方案..."):
-        calculator = AutoUpgradeCalculator(version, WEAPONS, JADES)
-        result = calculator.find_max_levels()
-    
+    if job is not None:
+        job.cancel()
+    if EXACT_MODE:
+        job = RecommendationJob(RECOMMENDATION_SETTINGS, RECOMMENDATION_INPUTS, None, EXACT_TIME_LIMIT)
+    else:
+        # 热启动：保留本会话上一次的规划，积分或库存变化时只回滚/续算受影响的部分
+        plan = st.session_state.setdefault("auto_upgrade_plan", UpgradePlan())
+        job = RecommendationJob(RECOMMENDATION_SETTINGS, RECOMMENDATION_INPUTS, plan)
+    st.session_state["recommendation_job"] = job
+    # 新的结果从第一页开始显示
+    st.session_state.pop("upgrade_history_page", None)
+
+result = None
+if job is not None:
+    if not job.done():
+        render_job_progress(job)
+    elif job.cancelled():
+        st.info("✋ 计算还在排队时就已停止，没有可以采用的方案，请重新点击计算")
+    else:
+        result = job.result()
+        if job.stopped:
+            if job.plan is not None:
+                st.info("✋ 已停止计算，以下为停止时已经规划好的部分方案（再次点击计算会从这里继续）")
+            else:
+                st.info("✋ 已停止搜索，以下为停止时找到的最好方案")
+
+if result is not None:
     if not result["upgraded"]:
         st.warning("当前积分和材料无法进行任何升级！请检查您的资源或降低等级差设置。")
     else:
         st.success("计算完成！")
         
+        # 精确模式与贪心方案的比较
+        if "exact_info" in result:
+            exact_info = result["exact_info"]
+            if exact_info["optimal"]:
+                bound_text = "已证明为最优方案"
+            else:
+                bound_text = f"已达到时间上限，最多可能还能多升 {exact_info['upper_bound'] - exact_info['exact_levels']} 级"
+            st.info(
+                f"🔍 精确模式：贪心方案共升 {exact_info['greedy_levels']} 级，精确搜索共升 {exact_info['exact_levels']} 级"
+                f"（多 {exact_info['gap']} 级），{bound_text}，用时 {exact_info['elapsed']:.2f} 秒"
+            )
+        
         # 显示结果总览
         st.subheader("🎯 最佳升级方案")
         
         if version == "详细版 (分别设置上下)":
             # 详细版显示方式
-            cols = st.columns(4)
-            
-            with cols[0]:
-                st.metric("步兵神兵上", 
-                         f"{calculator.level_number_to_str(result['weapon_targets']['步兵上'])}",
-                         f"升级{result['weapon_targets']['步兵上'] - result['weapon_currents']['步兵上']}级")
-            
-            with cols[1]:
-                st.metric("步兵神兵下", 
-                         f"{calculator.level_number_to_str(result['weapon_targets']['步兵下'])}",
-                         f"升级{result['weapon_targets']['步兵下'] - result['weapon_currents']['步兵下']}级")
+            cols = st.columns(2 * len(PLAN_TROOPS))
             
-            with cols[2]:
-                st.metric("弓兵神兵上", 
-                         f"{calculator.level_number_to_str(result['weapon_targets']['弓兵上'])}",
-                         f"升级{result['weapon_targets']['弓兵上'] - result['weapon_currents']['弓兵上']}级")
-            
-            with cols[3]:
-                st.metric("弓兵神兵下", 
-                         f"{calculator.level_number_to_str(result['weapon_targets']['弓兵下'])}",
-                         f"升级{result['weapon_targets']['弓兵下'] - result['weapon_currents']['弓兵下']}级")
+            for troop_idx, troop in enumerate(PLAN_TROOPS):
+                for position_idx, position in enumerate(("上", "下")):
+                    weapon_name = f"{troop}{position}"
+                    with cols[2 * troop_idx + position_idx]:
+                        st.metric(f"{troop}神兵{position}", 
+                                 f"{weapon_level_name(result['weapon_targets'][weapon_name])}",
+                                 f"升级{result['weapon_targets'][weapon_name] - result['weapon_currents'][weapon_name]}级")
             
             # 玉石结果
             st.subheader("💎 玉石升级结果")
             
-            # 步兵玉石
-            st.markdown("**步兵玉石**")
-            foot_jade_cols = st.columns(8)
-            for i in range(1, 5):
-                with foot_jade_cols[i-1]:
-                    st.metric(f"上{i}", 
-                             f"{result['jade_targets'][f'步兵上{i}']}级",
-                             f"+{result['jade_targets'][f'步兵上{i}'] - result['jade_currents'][f'步兵上{i}']}")
-            
-            for i in range(1, 5):
-                with foot_jade_cols[i+3]:
-                    st.metric(f"下{i}", 
-                             f"{result['jade_targets'][f'步兵下{i}']}级",
-                             f"+{result['jade_targets'][f'步兵下{i}'] - result['jade_currents'][f'步兵下{i}']}")
-            
-            # 弓兵玉石
-            st.markdown("**弓兵玉石**")
-            archer_jade_cols = st.columns(8)
-            for i in range(1, 5):
-                with archer_jade_cols[i-1]:
-                    st.metric(f"上{i}", 
-                             f"{result['jade_targets'][f'弓兵上{i}']}级",
-                             f"+{result['jade_targets'][f'弓兵上{i}'] - result['jade_currents'][f'弓兵上{i}']}")
-            
-            for i in range(1, 5):
-                with archer_jade_cols[i+3]:
-                    st.metric(f"下{i}", 
-                             f"{result['jade_targets'][f'弓兵下{i}']}级",
-                             f"+{result['jade_targets'][f'弓兵下{i}'] - result['jade_currents'][f'弓兵下{i}']}")
+            for troop in PLAN_TROOPS:
+                st.markdown(f"**{troop}玉石**")
+                jade_cols = st.columns(8)
+                for position_idx, position in enumerate(("上", "下")):
+                    for i in range(1, 5):
+                        jade_name = f"{troop}{position}{i}"
+                        with jade_cols[4 * position_idx + i - 1]:
+                            st.metric(f"{position}{i}", 
+                                     f"{result['jade_targets'][jade_name]}级",
+                                     f"+{result['jade_targets'][jade_name] - result['jade_currents'][jade_name]}")
         
         else:
             # 简略版显示方式
-            col1, col2 = st.columns(2)
+            troop_cols = st.columns(len(PLAN_TROOPS))
             
-            with col1:
-                st.metric("步兵神兵", 
-                         f"{calculator.level_number_to_str(result['weapon_targets']['步兵上'])}",
-                         f"升级{result['weapon_targets']['步兵上'] - result['weapon_currents']['步兵上']}级")
-                
-                st.markdown("**步兵玉石** (8个相同)")
-                st.metric("玉石等级", 
-                         f"{result['jade_targets']['步兵上1']}级",
-                         f"升级{result['jade_targets']['步兵上1'] - result['jade_currents']['步兵上1']}级")
-            
-            with col2:
-                st.metric("弓兵神兵", 
-                         f"{calculator.level_number_to_str(result['weapon_targets']['弓兵上'])}",
-                         f"升级{result['weapon_targets']['弓兵上'] - result['weapon_currents']['弓兵上']}级")
-                
-                st.markdown("**弓兵玉石** (8个相同)")
-                st.metric("玉石等级", 
-                         f"{result['jade_targets']['弓兵上1']}级",
-                         f"升级{result['jade_targets']['弓兵上1'] - result['jade_currents']['弓兵上1']}级")
+            for col, troop in zip(troop_cols, PLAN_TROOPS):
+                with col:
+                    st.metric(f"{troop}神兵", 
+                             f"{weapon_level_name(result['weapon_targets'][f'{troop}上'])}",
+                             f"升级{result['weapon_targets'][f'{troop}上'] - result['weapon_currents'][f'{troop}上']}级")
+                    
+                    st.markdown(f"**{troop}玉石** (8个相同)")
+                    st.metric("玉石等级", 
+                             f"{result['jade_targets'][f'{troop}上1']}级",
+                             f"升级{result['jade_targets'][f'{troop}上1'] - result['jade_currents'][f'{troop}上1']}级")
         
         st.markdown("---")
         
@@ -939,9 +537,9 @@ if st.button("开始自动计算最佳升级方案", type="primary", use_contain
             # 神兵升级详情
             st.write("**神兵升级详情:**")
             weapon_data = []
-            for weapon_name in ["步兵上", "步兵下", "弓兵上", "弓兵下"]:
+            for weapon_name in WEAPONS:
                 current_level = WEAPONS[weapon_name]["current"]
-                target_level = calculator.level_number_to_str(result['weapon_targets'][weapon_name])
+                target_level = weapon_level_name(result['weapon_targets'][weapon_name])
                 upgrade_levels = result['weapon_targets'][weapon_name] - result['weapon_currents'][weapon_name]
                 
                 weapon_data.append({
@@ -970,19 +568,109 @@ if st.button("开始自动计算最佳升级方案", type="primary", use_contain
             st.dataframe(pd.DataFrame(jade_data), use_container_width=True)
             
             # 升级顺序详情（可选）
-            if 'upgrade_history' in result and result['upgrade_history']:
+            if result.get('upgrade_history'):
                 st.write("**升级顺序详情:**")
-                history_data = []
-                for i, upgrade in enumerate(result['upgrade_history']):
-                    history_data.append({
-                        "序号": i+1,
-                        "升级项目": upgrade['item'],
-                        "类型": "神兵" if upgrade['type'] == 'weapon' else "玉石",
-                        "从等级": upgrade['from_level'],
-                        "到等级": upgrade['to_level'],
-                        "消耗积分": f"{upgrade['points_needed']:.1f}"
-                    })
-                st.dataframe(pd.DataFrame(history_data), use_container_width=True)
+                render_upgrade_history(result['upgrade_history'])
+
+st.markdown("---")
+
+# --- 5. 参数扫描：等级差和玉石百分比不用手动一个个试 ---
+st.header("🔍 参数扫描")
+st.caption("在当前积分、库存和等级下，对所有神兵等级差（0-10）、玉石等级差（0-10）和玉石百分比（30%-60%）组合运行自动计算，按总升级级数排序")
+if len(PLAN_TROOPS) > 2:
+    st.caption(f"参与规划的兵种多于两个时，扫描的等级差同时用于{BASE_TROOP}以外的每个兵种")
+
+# 扫描结果只取决于资源、当前等级和消耗表，这些不变时保留上一次的结果
+SWEEP_KEY = (version, RECOMMENDATION_INPUTS.troops, RECOMMENDATION_INPUTS.resources, RECOMMENDATION_INPUTS.weapons,
+             RECOMMENDATION_INPUTS.jades, WEAPON_COST_TABLE, JADE_COST_TABLE)
+sweep = st.session_state.get("parameter_sweep")
+if sweep is not None and sweep["key"] != SWEEP_KEY:
+    sweep = None
+
+if st.button("扫描全部等级差和百分比组合", use_container_width=True):
+    with st.spinner("正在计算所有参数组合..."):
+        sweep = {"key": SWEEP_KEY, "rows": sweep_settings(RECOMMENDATION_INPUTS)}
+    st.session_state["parameter_sweep"] = sweep
+
+if sweep is not None:
+    sweep_df = pd.DataFrame([
+        {
+            "神兵等级差": row["weapon_level_diff"],
+            "玉石等级差": row["jade_level_diff"],
+            "玉石百分比": f"{row['jade_percentage']}%",
+            "总升级级数": row["total_levels"],
+            "剩余积分": round(row["points_left"], 1),
+            "平衡差距": round(row["balance_gap"], 2),
+            **{
+                name: weapon_level_name(level) if kind == WEAPON_KIND else level
+                for name, (kind, _), level in zip(PLAN_GROUP_NAMES, PLAN_GROUPS, row["group_min_levels"])
+            }
+        }
+        for row in sweep["rows"]
+    ])
+    sweep_df.index = range(1, len(sweep_df) + 1)
+    st.dataframe(sweep_df, use_container_width=True, height=400)
+    st.caption(f"共 {len(sweep_df)} 种组合；平衡差距为最终未满级的各类之间归一化等级的最大差，越小越平衡；神兵和玉石列为各类最低等级")
+
+st.markdown("---")
+
+# --- 6. 积分预算曲线：每多花一些积分能多升几级 ---
+st.header("📈 积分预算曲线")
+st.caption("按当前设置计算从 0 到当前积分的每个预算下自动计算能升的总级数，标出最先买不起的类别发生变化的位置")
+
+BUDGET_STEP = st.number_input("采样间隔（积分）", min_value=1, value=1000, step=100)
+BUDGET_CURVE_KEY = (RECOMMENDATION_INPUTS, BUDGET_STEP)
+budget_curve = st.session_state.get("budget_curve")
+if budget_curve is not None and budget_curve["key"] != BUDGET_CURVE_KEY:
+    budget_curve = None
+
+if st.button("计算积分预算曲线", use_container_width=True):
+    with st.spinner("正在计算积分预算曲线..."):
+        budget_curve = {"key": BUDGET_CURVE_KEY, **build_budget_curve(RECOMMENDATION_INPUTS, BUDGET_STEP)}
+    st.session_state["budget_curve"] = budget_curve
+
+if budget_curve is not None:
+    curve_rows = budget_curve["rows"]
+    curve_df = pd.DataFrame([
+        {
+            "积分预算": row["budget"],
+            "总升级级数": row["total_levels"],
+            "比上一档多升": row["total_levels"] - (curve_rows[idx - 1]["total_levels"] if idx > 0 else 0),
+            "实际需要积分": round(row["points_needed"], 1),
+            "最先买不起": PLAN_GROUP_NAMES[row["bottleneck"]] if row["bottleneck"] is not None else "全部满级"
+        }
+        for idx, row in enumerate(curve_rows)
+    ])
+    breakpoint_df = pd.DataFrame([
+        {
+            "积分预算": round(budget, 1),
+            "最先买不起": PLAN_GROUP_NAMES[group_idx] if group_idx is not None else "全部满级"
+        }
+        for budget, group_idx in budget_curve["breakpoints"]
+    ], columns=["积分预算", "最先买不起"])
+    
+    # 曲线上用竖线标出转折点：竖线之后每积分能多升的级数（曲线斜率）随最先买不起的类别改变
+    curve_chart = alt.Chart(curve_df).mark_line().encode(
+        x=alt.X("积分预算:Q"),
+        y=alt.Y("总升级级数:Q"),
+        tooltip=["积分预算", "总升级级数", "最先买不起"]
+    )
+    breakpoint_rules = alt.Chart(breakpoint_df).mark_rule(strokeDash=[4, 4]).encode(
+        x="积分预算:Q",
+        color=alt.Color("最先买不起:N", title="转折后最先买不起"),
+        tooltip=["积分预算", "最先买不起"]
+    )
+    st.altair_chart(curve_chart + breakpoint_rules, use_container_width=True)
+    st.caption("注意：自动计算遇到买不起的一级就停止该类升级，预算多一点时积分可能先花在更贵的一级上，所以总级数偶尔会比上一档少")
+    if budget_curve["step"] != BUDGET_STEP:
+        st.caption(f"采样点过多，采样间隔已放大为 {budget_curve['step']} 积分")
+    
+    if not breakpoint_df.empty:
+        st.write("**转折点**（图中虚线；预算达到这里之后，最先买不起的类别换成了下面这一类）:")
+        st.dataframe(breakpoint_df, use_container_width=True)
+    
+    with st.expander("查看每个预算的详细数据"):
+        st.dataframe(curve_df, use_container_width=True, hide_index=True)
 
 st.markdown("---")
 st.caption("提示：修改侧边栏的设置后，点击上方按钮重新计算。切换版本后，当前设置会被重置。")
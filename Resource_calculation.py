@@ -1,5 +1,10 @@
+import altair as alt
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+from resource_calculator import RESOURCE_KEYS, calculate_resources, calculate_resources_batch, compare_strategies_grid, min_packs_for_target
+
 # 设置页面标题和布局
 st.set_page_config(
     page_title="游戏资源计算器",
@@ -143,216 +148,6 @@ def format_large_value(value, show_original_unit=False):
     else:
         return f"{value:,.2f}万"
 
-def calculate_resources(meat, wood, coal, iron, pack_1w, pack_10w, pack_100w, strategy_type):
-    """
-    计算包裹内资源总数量（单位：万）
-    提供两种自选包使用策略
-    """
-    # 记录原始资源
-    original_meat, original_wood, original_coal, original_iron = meat, wood, coal, iron
-    
-    # 定义比例
-    RATIO_MEAT, RATIO_WOOD, RATIO_COAL, RATIO_IRON = 4, 4, 2, 1
-    
-    # 创建自选包列表，按从大到小排序（100w优先，1w最后）
-    packs = []
-    packs.extend([100] * pack_100w)
-    packs.extend([10] * pack_10w)
-    packs.extend([1] * pack_1w)
-    
-    # 策略1: 按比例补充
-    if strategy_type == 0:  # 按比例补充
-        # 计算当前各资源的比例倍数
-        meat_multiple = meat / RATIO_MEAT if RATIO_MEAT > 0 else 0
-        wood_multiple = wood / RATIO_WOOD if RATIO_WOOD > 0 else 0
-        coal_multiple = coal / RATIO_COAL if RATIO_COAL > 0 else 0
-        iron_multiple = iron / RATIO_IRON if RATIO_IRON > 0 else 0
-        
-        # 使用所有自选包（从大到小）
-        for pack_value in packs:
-            # 找出比例倍数最小的资源
-            min_multiple = min(meat_multiple, wood_multiple, coal_multiple, iron_multiple)
-            
-            if meat_multiple == min_multiple:
-                meat += pack_value
-                meat_multiple = meat / RATIO_MEAT
-            elif wood_multiple == min_multiple:
-                wood += pack_value
-                wood_multiple = wood / RATIO_WOOD
-            elif coal_multiple == min_multiple:
-                coal_gain = pack_value / 2
-                coal += coal_gain
-                coal_multiple = coal / RATIO_COAL
-            else:
-                iron_gain = pack_value / 4
-                iron += iron_gain
-                iron_multiple = iron / RATIO_IRON
-    
-    # 策略2: 按顺序补充
-    else:  # 按顺序补充
-        # 计算当前各资源的比例倍数
-        meat_multiple = meat / RATIO_MEAT if RATIO_MEAT > 0 else 0
-        wood_multiple = wood / RATIO_WOOD if RATIO_WOOD > 0 else 0
-        coal_multiple = coal / RATIO_COAL if RATIO_COAL > 0 else 0
-        iron_multiple = iron / RATIO_IRON if RATIO_IRON > 0 else 0
-        
-        # 找到最大的比例倍数
-        max_multiple = max(meat_multiple, wood_multiple, coal_multiple, iron_multiple)
-        
-        # 阶段1: 补充肉，直到肉的比例倍数等于最大比例倍数
-        for pack_value in packs[:]:  # 使用副本遍历
-            if meat_multiple < max_multiple:
-                # 计算需要多少肉才能达到最大倍数
-                meat_needed = max_multiple * RATIO_MEAT - meat
-                
-                # 使用当前最大的包补充肉
-                meat += pack_value
-                meat_multiple = meat / RATIO_MEAT
-                packs.remove(pack_value)
-                
-                # 更新最大倍数（因为补充肉后可能肉成为新的最大）
-                max_multiple = max(max_multiple, meat_multiple)
-            else:
-                break
-        
-        # 阶段2: 补充木头，直到木头的比例倍数等于最大比例倍数
-        for pack_value in packs[:]:
-            if wood_multiple < max_multiple:
-                # 计算需要多少木头才能达到最大倍数
-                wood_needed = max_multiple * RATIO_WOOD - wood
-                
-                # 使用当前最大的包补充木头
-                wood += pack_value
-                wood_multiple = wood / RATIO_WOOD
-                packs.remove(pack_value)
-                
-                # 更新最大倍数
-                max_multiple = max(max_multiple, wood_multiple)
-            else:
-                break
-        
-        # 阶段3: 补充煤，直到煤的比例倍数等于最大比例倍数
-        for pack_value in packs[:]:
-            if coal_multiple < max_multiple:
-                # 计算需要多少煤才能达到最大倍数
-                coal_needed = max_multiple * RATIO_COAL - coal
-                
-                # 使用当前最大的包补充煤
-                coal_gain = pack_value / 2
-                coal += coal_gain
-                coal_multiple = coal / RATIO_COAL
-                packs.remove(pack_value)
-                
-                # 更新最大倍数
-                max_multiple = max(max_multiple, coal_multiple)
-            else:
-                break
-        
-        # 阶段4: 补充铁，直到铁的比例倍数等于最大比例倍数
-        for pack_value in packs[:]:
-            if iron_multiple < max_multiple:
-                # 计算需要多少铁才能达到最大倍数
-                iron_needed = max_multiple * RATIO_IRON - iron
-                
-                # 使用当前最大的包补充铁
-                iron_gain = pack_value / 4
-                iron += iron_gain
-                iron_multiple = iron / RATIO_IRON
-                packs.remove(pack_value)
-                
-                # 更新最大倍数
-                max_multiple = max(max_multiple, iron_multiple)
-            else:
-                break
-        
-        # 阶段5: 如果还有剩余自选包，切换为按比例补充
-        if packs:
-            # 重新计算当前比例倍数
-            meat_multiple = meat / RATIO_MEAT
-            wood_multiple = wood / RATIO_WOOD
-            coal_multiple = coal / RATIO_COAL
-            iron_multiple = iron / RATIO_IRON
-            
-            # 按比例补充剩余自选包
-            for pack_value in packs:
-                # 找出比例倍数最小的资源
-                min_multiple = min(meat_multiple, wood_multiple, coal_multiple, iron_multiple)
-                
-                if meat_multiple == min_multiple:
-                    meat += pack_value
-                    meat_multiple = meat / RATIO_MEAT
-                elif wood_multiple == min_multiple:
-                    wood += pack_value
-                    wood_multiple = wood / RATIO_WOOD
-                elif coal_multiple == min_multiple:
-                    coal_gain = pack_value / 2
-                    coal += coal_gain
-                    coal_multiple = coal / RATIO_COAL
-                else:
-                    iron_gain = pack_value / 4
-                    iron += iron_gain
-                    iron_multiple = iron / RATIO_IRON
-    
-    # 计算最终比例和理想资源量
-    final_min_ratio = min(
-        meat / RATIO_MEAT if RATIO_MEAT > 0 else float('inf'),
-        wood / RATIO_WOOD if RATIO_WOOD > 0 else float('inf'),
-        coal / RATIO_COAL if RATIO_COAL > 0 else float('inf'),
-        iron / RATIO_IRON if RATIO_IRON > 0 else float('inf')
-    )
-    
-    # 计算理想按比例的资源量
-    ideal_meat = final_min_ratio * RATIO_MEAT
-    ideal_wood = final_min_ratio * RATIO_WOOD
-    ideal_coal = final_min_ratio * RATIO_COAL
-    ideal_iron = final_min_ratio * RATIO_IRON
-    
-    # 计算资源过剩情况
-    excess_meat = meat - ideal_meat
-    excess_wood = wood - ideal_wood
-    excess_coal = coal - ideal_coal
-    excess_iron = iron - ideal_iron
-    
-    # 计算每种资源通过自选包实际增加的数量
-    meat_added = meat - original_meat
-    wood_added = wood - original_wood
-    coal_added = coal - original_coal
-    iron_added = iron - original_iron
-    
-    return {
-        'final': {
-            'meat': meat,
-            'wood': wood,
-            'coal': coal,
-            'iron': iron
-        },
-        'original': {
-            'meat': original_meat,
-            'wood': original_wood,
-            'coal': original_coal,
-            'iron': original_iron
-        },
-        'excess': {
-            'meat': excess_meat,
-            'wood': excess_wood,
-            'coal': excess_coal,
-            'iron': excess_iron
-        },
-        'added': {
-            'meat': meat_added,
-            'wood': wood_added,
-            'coal': coal_added,
-            'iron': iron_added
-        },
-        'ideal': {
-            'meat': ideal_meat,
-            'wood': ideal_wood,
-            'coal': ideal_coal,
-            'iron': ideal_iron
-        },
-        'ratio_multiple': final_min_ratio
-    }
-
 # 点击按钮时进行计算
 if calculate_button:
     # 转换单位为万
@@ -446,6 +241,194 @@ if calculate_button:
     except Exception as e:
         st.error(f"计算过程中出现错误: {e}")
 
+# --- 批量计算：联盟成员的背包统计一次算完 ---
+st.markdown("---")
+st.subheader("📑 批量计算")
+st.caption("上传 CSV 文件（每行一个背包，资源单位为万），一次计算所有背包在两种策略下的结果，可以下载结果表格")
+
+# CSV 列名 -> calculate_resources_batch 的参数
+BATCH_RESOURCE_COLUMNS = {"肉": "meat", "木": "wood", "煤": "coal", "铁": "iron"}
+BATCH_PACK_COLUMNS = {"1w资源包数量": "pack_1w", "10w资源包数量": "pack_10w", "100w资源包数量": "pack_100w"}
+BATCH_STRATEGIES = (("按比例", 0), ("按顺序", 1))
+
+def build_batch_result_table(batch_df):
+    """把上传的表格整理成列数组，两种策略各批量计算一次，结果列追加在原表格后面"""
+    columns = {}
+    for column, name in BATCH_RESOURCE_COLUMNS.items():
+        columns[name] = pd.to_numeric(batch_df[column], errors="coerce").fillna(0).to_numpy(dtype=float)
+    for column, name in BATCH_PACK_COLUMNS.items():
+        columns[name] = pd.to_numeric(batch_df[column], errors="coerce").fillna(0).to_numpy().astype(int)
+    
+    result_df = batch_df.copy()
+    for label, strategy_type in BATCH_STRATEGIES:
+        result = calculate_resources_batch(strategy_type=strategy_type, **columns)
+        for section, section_label in (("final", "最终"), ("added", "增加"), ("excess", "过剩")):
+            for column, key in zip(BATCH_RESOURCE_COLUMNS, RESOURCE_KEYS):
+                result_df[f"{label}{section_label}{column}"] = result[section][key].round(2)
+        result_df[f"{label}比例倍数"] = result["ratio_multiple"].round(2)
+    return result_df
+
+template_df = pd.DataFrame([{"名称": "示例", "肉": 0, "木": 0, "煤": 0, "铁": 0,
+                             "1w资源包数量": 0, "10w资源包数量": 0, "100w资源包数量": 0}])
+st.download_button(
+    "📄 下载 CSV 模板",
+    template_df.to_csv(index=False).encode("utf-8-sig"),
+    file_name="背包统计模板.csv",
+    mime="text/csv"
+)
+
+uploaded_file = st.file_uploader("上传背包统计 CSV", type="csv")
+if uploaded_file is not None:
+    try:
+        batch_df = pd.read_csv(uploaded_file)
+    except Exception as e:
+        batch_df = None
+        st.error(f"无法读取 CSV 文件: {e}")
+    
+    if batch_df is not None:
+        missing_columns = [column for column in (*BATCH_RESOURCE_COLUMNS, *BATCH_PACK_COLUMNS) if column not in batch_df.columns]
+        if missing_columns:
+            st.error(f"CSV 缺少以下列: {'、'.join(missing_columns)}（可以下载模板参考）")
+        else:
+            batch_result_df = build_batch_result_table(batch_df)
+            st.dataframe(batch_result_df, use_container_width=True)
+            st.caption(f"共 {len(batch_result_df)} 个背包；比例倍数越高，按 4:4:2:1 能用上的资源越多")
+            st.download_button(
+                "📥 下载计算结果",
+                batch_result_df.to_csv(index=False).encode("utf-8-sig"),
+                file_name="资源计算结果.csv",
+                mime="text/csv"
+            )
+
+# --- 策略对比：在一片背包网格上比较两种策略 ---
+st.markdown("---")
+st.subheader("🆚 策略对比")
+st.caption("以上面填写的资源和资源包为基础，选择两个数量在一定范围内变化，比较两种策略的比例倍数和过剩资源")
+
+# 可作为坐标轴的数量：显示名称 -> (calculate_resources_batch 的参数, 滑块上限, 默认上限)
+GRID_AXES = {
+    "肉（万）": ("meat", 100000, 10000),
+    "木（万）": ("wood", 100000, 10000),
+    "煤（万）": ("coal", 50000, 5000),
+    "铁（万）": ("iron", 25000, 2500),
+    "1w资源包数量": ("pack_1w", 100000, 5000),
+    "10w资源包数量": ("pack_10w", 10000, 500),
+    "100w资源包数量": ("pack_100w", 1000, 50),
+}
+
+def grid_axis_values(axis_label, value_range, points):
+    """坐标轴上的取值：资源包个数取整数（去掉重复值），资源量均匀取点"""
+    values = np.linspace(value_range[0], value_range[1], points)
+    if GRID_AXES[axis_label][0].startswith("pack_"):
+        return np.unique(values.round().astype(int))
+    return values.round(2)
+
+# 热力图颜色：按比例补充更好的一侧为红色，按顺序补充更好的一侧为蓝色，两者相同为白色
+RATIO_BETTER_COLOR = "#d6604d"
+SEQUENTIAL_BETTER_COLOR = "#4393c3"
+EQUAL_COLOR = "#f7f7f7"
+
+def grid_heatmap_scale(ratio_better_sign):
+    """
+    差值（按比例 - 按顺序）的颜色刻度：0 固定为白色；ratio_better_sign 为按比例更好时差值的符号
+    （比例倍数差为 +1，越大越好；过剩资源差为 -1，越小越好）
+    """
+    if ratio_better_sign > 0:
+        colors = [SEQUENTIAL_BETTER_COLOR, EQUAL_COLOR, RATIO_BETTER_COLOR]
+    else:
+        colors = [RATIO_BETTER_COLOR, EQUAL_COLOR, SEQUENTIAL_BETTER_COLOR]
+    return alt.Scale(domainMid=0, range=colors)
+
+def render_grid_heatmap(grid_values, x_label, x_values, y_label, y_values, title, legend, ratio_better_sign):
+    """网格上的差值画成热力图，颜色见 grid_heatmap_scale"""
+    x_grid, y_grid = np.meshgrid(x_values, y_values)
+    heatmap_df = pd.DataFrame({x_label: x_grid.ravel(), y_label: y_grid.ravel(), legend: grid_values.ravel().round(2)})
+    chart = alt.Chart(heatmap_df, title=title).mark_rect().encode(
+        x=alt.X(f"{x_label}:O", axis=alt.Axis(labelOverlap=True)),
+        y=alt.Y(f"{y_label}:O", sort="descending", axis=alt.Axis(labelOverlap=True)),
+        color=alt.Color(f"{legend}:Q", scale=grid_heatmap_scale(ratio_better_sign)),
+        tooltip=[x_label, y_label, legend]
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+axis_labels = list(GRID_AXES)
+axis_col1, axis_col2 = st.columns(2)
+with axis_col1:
+    grid_x_label = st.selectbox("横轴", axis_labels, index=axis_labels.index("1w资源包数量"))
+    grid_x_range = st.slider(f"{grid_x_label}范围", 0, GRID_AXES[grid_x_label][1], (0, GRID_AXES[grid_x_label][2]),
+                             key=f"grid_x_range_{grid_x_label}")
+with axis_col2:
+    grid_y_label = st.selectbox("纵轴", [label for label in axis_labels if label != grid_x_label],
+                                index=0 if grid_x_label != "肉（万）" else 1)
+    grid_y_range = st.slider(f"{grid_y_label}范围", 0, GRID_AXES[grid_y_label][1], (0, GRID_AXES[grid_y_label][2]),
+                             key=f"grid_y_range_{grid_y_label}")
+grid_points = st.slider("每个方向的取点数", min_value=10, max_value=80, value=40, step=5)
+
+grid_x_values = grid_axis_values(grid_x_label, grid_x_range, grid_points)
+grid_y_values = grid_axis_values(grid_y_label, grid_y_range, grid_points)
+grid_base = {
+    "meat": convert_to_wan(meat_num, meat_unit),
+    "wood": convert_to_wan(wood_num, wood_unit),
+    "coal": convert_to_wan(coal_num, coal_unit),
+    "iron": convert_to_wan(iron_num, iron_unit),
+    "pack_1w": pack_1w,
+    "pack_10w": pack_10w,
+    "pack_100w": pack_100w,
+}
+strategy_grid = compare_strategies_grid(
+    grid_base, GRID_AXES[grid_x_label][0], grid_x_values, GRID_AXES[grid_y_label][0], grid_y_values
+)
+
+render_grid_heatmap(strategy_grid["multiple_diff"], grid_x_label, grid_x_values, grid_y_label, grid_y_values,
+                    "比例倍数差（按比例 - 按顺序，红色为按比例更好，蓝色为按顺序更好）", "比例倍数差", ratio_better_sign=1)
+render_grid_heatmap(strategy_grid["excess_diff"], grid_x_label, grid_x_values, grid_y_label, grid_y_values,
+                    "过剩资源差（按比例 - 按顺序，万，红色为按比例浪费更少，蓝色为按顺序浪费更少）", "过剩资源差",
+                    ratio_better_sign=-1)
+
+ratio_better = (strategy_grid["multiple_diff"] > 1e-9).mean() * 100
+sequential_better = (strategy_grid["multiple_diff"] < -1e-9).mean() * 100
+st.caption(f"网格中按比例补充更好的占 {ratio_better:.1f}%，按顺序补充更好的占 {sequential_better:.1f}%，其余两者相同")
+
+# --- 反向查询：达到目标最少需要多少自选包 ---
+st.markdown("---")
+st.subheader("🎯 反向查询")
+st.caption("以上面填写的资源和所选策略为基础，计算达到目标比例倍数最少需要的自选包（比例倍数 = 肉÷4 = 木÷4 = 煤÷2 = 铁÷1，单位：万）")
+
+target_mode = st.radio("目标", ["比例倍数", "按 4:4:2:1 的目标资源量（填写肉的目标量）"], horizontal=True)
+target_col_num, target_col_unit = st.columns([4, 1])
+with target_col_num:
+    target_value = st.number_input(
+        "目标数值", min_value=0.0, value=0.0, step=100.0,
+        help="选择比例倍数时填写目标倍数；选择目标资源量时填写肉的目标量（木同量，煤为一半，铁为四分之一）"
+    )
+with target_col_unit:
+    st.markdown('<div style="margin-top: 28px;"></div>', unsafe_allow_html=True)  # 垂直对齐
+    target_unit = st.selectbox("单位", ["万", "亿"], key="target_unit", label_visibility="collapsed")
+
+target_multiple = convert_to_wan(target_value, target_unit)
+if target_mode != "比例倍数":
+    target_multiple /= 4
+
+if target_multiple > 0:
+    target_strategy_type = 0 if "按比例补充" in strategy else 1
+    target_packs = min_packs_for_target(
+        grid_base["meat"], grid_base["wood"], grid_base["coal"], grid_base["iron"], target_multiple, target_strategy_type
+    )
+    st.markdown(
+        f"目标：肉/木 {format_large_value(target_multiple * 4)}，煤 {format_large_value(target_multiple * 2)}，"
+        f"铁 {format_large_value(target_multiple)}（{strategy.split('（')[0]}）"
+    )
+    single_cols = st.columns(3)
+    for col, (pack_value, label) in zip(single_cols, ((1, "只用1w资源包"), (10, "只用10w资源包"), (100, "只用100w资源包"))):
+        with col:
+            st.metric(label, f"{target_packs['single'][pack_value]:,} 个")
+
+    combined_100w, combined_10w, combined_1w = target_packs["combined"]
+    st.info(
+        f"三种包混用时最少共 {combined_100w + combined_10w + combined_1w:,} 个："
+        f"100w × {combined_100w:,}，10w × {combined_10w:,}，1w × {combined_1w:,}"
+    )
+
 # 页脚
 st.markdown("---")
 st.markdown(
@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
 
+from cost_table_editor import render_upgrade_cost_editors
+from level_catalog import WEAPON_LEVEL_NAMES, JADE_LEVEL_OPTIONS
+from upgrade_calculator import ResourceSettings, UpgradeRequest, calculate_all_upgrades
+
 # ============= Streamlit 网页应用 =============
 st.set_page_config(page_title="神兵玉石升级计算器", layout="wide")
 st.title("⚔️💎 神兵玉石材料兑换计算器")
@@ -49,8 +53,8 @@ if version == "详细版 (逐项设置)":
     # --- 详细版神兵等级选择 ---
     st.header("⚔️ 神兵升级目标")
     
-    # 定义等级选项
-    weapon_level_options = ["未拥有"] + [f"绿色{i}级" for i in range(1, 6)] + [f"蓝色{i}级" for i in range(1, 6)] + [f"紫色{i}级" for i in range(1, 11)] + [f"红色{i}级" for i in range(1, 31)]
+    # 等级选项（等级目录中预先构建好的元组）
+    weapon_level_options = WEAPON_LEVEL_NAMES
     
     # 为6件神兵创建6列
     weapon_cols = st.columns(6)
@@ -74,7 +78,7 @@ if version == "详细版 (逐项设置)":
     st.caption("24个玉石，请分别设置当前和目标等级（0级为未激活）")
     
     # 定义玉石等级选项 (0-25级)
-    jade_level_options = list(range(0, 26))
+    jade_level_options = JADE_LEVEL_OPTIONS
     
     # 使用展开/折叠器来组织，避免页面过长
     jade_types = ["步兵上", "步兵下", "骑兵上", "骑兵下", "弓兵上", "弓兵下"]
@@ -99,8 +103,8 @@ else:
     st.header("⚔️ 神兵升级目标 (批量设置)")
     st.caption("每个兵种上下两件神兵使用相同等级")
     
-    # 定义等级选项
-    weapon_level_options = ["未拥有"] + [f"绿色{i}级" for i in range(1, 6)] + [f"蓝色{i}级" for i in range(1, 6)] + [f"紫色{i}级" for i in range(1, 11)] + [f"红色{i}级" for i in range(1, 31)]
+    # 等级选项（等级目录中预先构建好的元组）
+    weapon_level_options = WEAPON_LEVEL_NAMES
     
     # 为3个兵种创建3列
     troop_cols = st.columns(3)
@@ -131,7 +135,7 @@ else:
     st.caption("每个兵种只需设置一个玉石等级，该兵种上下共8个玉石都使用此等级")
     
     # 定义玉石等级选项 (0-25级)
-    jade_level_options = list(range(0, 26))
+    jade_level_options = JADE_LEVEL_OPTIONS
     
     # 为3个兵种创建3列
     jade_troop_cols = st.columns(3)
@@ -232,235 +236,36 @@ extra_points_total = sum(item['points_per'] * item['times'] for item in st.sessi
 
 st.markdown("---")
 
-# --- 3. 核心数据与计算器类（已修改以包含额外兑换）---
-WEAPON_UPGRADE_COSTS = [
-    [1000, 50, 0], [1500, 75, 0], [2000, 100, 0], [2500, 125, 0], [3000, 150, 0],
-    [3500, 175, 0], [4000, 200, 0], [4500, 225, 0], [5000, 250, 0], [5500, 275, 0],
-    [6000, 300, 150], [6500, 325, 160], [7000, 350, 170], [7500, 375, 180], [8000, 400, 180],
-    [8500, 425, 190], [9000, 450, 200], [9500, 475, 200], [10000, 500, 210], [10500, 525, 220],
-    [11000, 550, 220], [12000, 600, 230], [13000, 650, 250], [14000, 700, 260], [15000, 750, 270],
-    [16000, 800, 280], [17000, 850, 290], [18000, 900, 300], [19000, 950, 300], [20000, 1000, 310],
-    [21000, 1050, 320], [22000, 1100, 320], [23000, 1150, 320], [24000, 1200, 320], [25000, 1250, 330],
-    [26000, 1300, 330], [27000, 1350, 340], [28000, 1400, 350], [29000, 1450, 360], [30000, 1500, 360],
-    [31000, 1550, 360], [32000, 1600, 370], [33000, 1650, 380], [34000, 1700, 390], [35000, 1750, 390],
-    [36000, 1800, 400], [37000, 1850, 410], [38000, 1900, 420], [39000, 1950, 430], [40000, 2000, 440]
-]
+# --- 消耗表调整（游戏版本更新后使用）---
+# 未修改时使用进程共享的默认消耗表，修改后使用当前会话的树状数组表
+WEAPON_COST_TABLE, JADE_COST_TABLE = render_upgrade_cost_editors()
 
-JADE_UPGRADE_COSTS = [
-    [2, 10], [4, 12], [6, 14], [8, 16], [10, 18],
-    [12, 20], [16, 24], [20, 28], [30, 32], [40, 36],
-    [60, 50], [100, 60], [140, 70], [180, 80], [220, 90],
-    [240, 100], [240, 140], [260, 180], [260, 220], [280, 260],
-    [300, 300], [320, 340], [340, 380], [360, 420], [380, 460]
-]
+st.markdown("---")
 
-class UpgradeCalculator:
-    def __init__(self):
-        # 神兵相关 - 处理None值
-        self.current_points = CURRENT_POINTS if CURRENT_POINTS is not None else 0
-        self.points_per_wood = POINTS_PER_WOOD
-        self.points_per_mithril = POINTS_PER_MITHRIL
-        self.points_per_lapis = POINTS_PER_LAPIS
-        self.current_wood = CURRENT_WOOD if CURRENT_WOOD is not None else 0
-        self.current_mithril = CURRENT_MITHRIL if CURRENT_MITHRIL is not None else 0
-        self.current_lapis = CURRENT_LAPIS if CURRENT_LAPIS is not None else 0
-        self.weapons = WEAPONS
-        self.weapon_upgrade_costs = WEAPON_UPGRADE_COSTS
-        
-        # 玉石相关 - 处理None值
-        self.points_per_carving_knife = POINTS_PER_CARVING_KNIFE
-        self.points_per_unpolished_jade = POINTS_PER_UNPOLISHED_JADE
-        self.current_carving_knife = CURRENT_CARVING_KNIFE if CURRENT_CARVING_KNIFE is not None else 0
-        self.current_unpolished_jade = CURRENT_UNPOLISHED_JADE if CURRENT_UNPOLISHED_JADE is not None else 0
-        self.jades = JADES
-        self.jade_upgrade_costs = JADE_UPGRADE_COSTS
-        
-        # 额外兑换部分
-        self.extra_items = st.session_state.extra_items
-        
-    def level_str_to_number(self, level_str):
-        level_str = level_str.strip()
-        if level_str == "未拥有": return 0
-        if "绿色" in level_str:
-            level_num = int(level_str.replace("绿色", "").replace("级", ""))
-            if 1 <= level_num <= 5: return level_num
-        elif "蓝色" in level_str:
-            level_num = int(level_str.replace("蓝色", "").replace("级", ""))
-            if 1 <= level_num <= 5: return level_num + 5
-        elif "紫色" in level_str:
-            level_num = int(level_str.replace("紫色", "").replace("级", ""))
-            if 1 <= level_num <= 10: return level_num + 10
-        elif "红色" in level_str:
-            level_num = int(level_str.replace("红色", "").replace("级", ""))
-            if 1 <= level_num <= 30: return level_num + 20
-        raise ValueError(f"无效的等级格式: {level_str}")
-    
-    def level_number_to_str(self, level_num):
-        if level_num == 0: return "未拥有"
-        elif 1 <= level_num <= 5: return f"绿色{level_num}级"
-        elif 6 <= level_num <= 10: return f"蓝色{level_num-5}级"
-        elif 11 <= level_num <= 20: return f"紫色{level_num-10}级"
-        elif 21 <= level_num <= 50: return f"红色{level_num-20}级"
-        else: return "未知等级"
-    
-    def calculate_weapon_upgrade(self, current_level_str, target_level_str):
-        current_level = self.level_str_to_number(current_level_str)
-        target_level = self.level_str_to_number(target_level_str)
-        
-        if target_level <= current_level:
-            return {
-                "current_level": current_level_str,
-                "target_level": target_level_str,
-                "total_wood_needed": 0,
-                "total_mithril_needed": 0,
-                "total_lapis_needed": 0,
-                "levels_upgraded": 0,
-                "need_upgrade": False
-            }
-        
-        total_wood_needed = total_mithril_needed = total_lapis_needed = 0
-        for level in range(current_level, target_level):
-            cost_wood, cost_mithril, cost_lapis = self.weapon_upgrade_costs[level]
-            total_wood_needed += cost_wood
-            total_mithril_needed += cost_mithril
-            total_lapis_needed += cost_lapis
-        
-        return {
-            "current_level": current_level_str,
-            "target_level": target_level_str,
-            "total_wood_needed": total_wood_needed,
-            "total_mithril_needed": total_mithril_needed,
-            "total_lapis_needed": total_lapis_needed,
-            "levels_upgraded": target_level - current_level,
-            "need_upgrade": True
-        }
-    
-    def calculate_jade_upgrade(self, current_level, target_level):
-        if target_level <= current_level:
-            return {
-                "current_level": current_level,
-                "target_level": target_level,
-                "total_knife_needed": 0,
-                "total_jade_needed": 0,
-                "levels_upgraded": 0,
-                "need_upgrade": False
-            }
-        
-        total_knife_needed = total_jade_needed = 0
-        for level in range(current_level, target_level):
-            cost_knife, cost_jade = self.jade_upgrade_costs[level]
-            total_knife_needed += cost_knife
-            total_jade_needed += cost_jade
-        
-        return {
-            "current_level": current_level,
-            "target_level": target_level,
-            "total_knife_needed": total_knife_needed,
-            "total_jade_needed": total_jade_needed,
-            "levels_upgraded": target_level - current_level,
-            "need_upgrade": True
-        }
-    
-    def calculate_extra_items(self):
-        """计算额外兑换项目的总积分消耗"""
-        extra_points_needed = 0
-        extra_items_details = []
-        
-        for item in self.extra_items:
-            if item['name'] and item['points_per'] > 0 and item['times'] > 0:
-                item_total = item['points_per'] * item['times']
-                extra_points_needed += item_total
-                extra_items_details.append({
-                    'name': item['name'],
-                    'points_per': item['points_per'],
-                    'times': item['times'],
-                    'total': item_total
-                })
-        
-        return {
-            'extra_points_needed': extra_points_needed,
-            'extra_items_details': extra_items_details
-        }
-    
-    def calculate_all_upgrades(self):
-        # 计算额外兑换部分
-        extra_results = self.calculate_extra_items()
-        extra_points_needed = extra_results['extra_points_needed']
-        
-        # 神兵升级计算
-        weapon_results = {}
-        weapon_wood_needed = weapon_mithril_needed = weapon_lapis_needed = 0
-        
-        for weapon_name, levels in self.weapons.items():
-            result = self.calculate_weapon_upgrade(levels["current"], levels["target"])
-            weapon_results[weapon_name] = result
-            weapon_wood_needed += result["total_wood_needed"]
-            weapon_mithril_needed += result["total_mithril_needed"]
-            weapon_lapis_needed += result["total_lapis_needed"]
-        
-        # 玉石升级计算
-        jade_results = {}
-        jade_knife_needed = jade_jade_needed = 0
-        
-        for jade_name, levels in self.jades.items():
-            result = self.calculate_jade_upgrade(levels["current"], levels["target"])
-            jade_results[jade_name] = result
-            jade_knife_needed += result["total_knife_needed"]
-            jade_jade_needed += result["total_jade_needed"]
-        
-        # 计算需要购买的材料
-        wood_need_buy = max(0, weapon_wood_needed - self.current_wood)
-        mithril_need_buy = max(0, weapon_mithril_needed - self.current_mithril)
-        lapis_need_buy = max(0, weapon_lapis_needed - self.current_lapis)
-        knife_need_buy = max(0, jade_knife_needed - self.current_carving_knife)
-        jade_need_buy = max(0, jade_jade_needed - self.current_unpolished_jade)
-        
-        # 计算所需总积分（包括额外兑换）
-        total_points_needed = (
-            wood_need_buy * self.points_per_wood +
-            mithril_need_buy * self.points_per_mithril +
-            lapis_need_buy * self.points_per_lapis +
-            knife_need_buy * self.points_per_carving_knife +
-            jade_need_buy * self.points_per_unpolished_jade +
-            extra_points_needed  # 添加额外兑换积分
-        )
-        
-        # 计算升级后剩余材料
-        wood_left_after = max(0, self.current_wood - weapon_wood_needed)
-        mithril_left_after = max(0, self.current_mithril - weapon_mithril_needed)
-        lapis_left_after = max(0, self.current_lapis - weapon_lapis_needed)
-        knife_left_after = max(0, self.current_carving_knife - jade_knife_needed)
-        jade_left_after = max(0, self.current_unpolished_jade - jade_jade_needed)
-        
-        # 检查积分是否足够
-        points_shortage = max(0, total_points_needed - self.current_points)
-        
-        return {
-            "weapon_results": weapon_results,
-            "jade_results": jade_results,
-            "extra_results": extra_results,
-            "weapon_wood_needed": weapon_wood_needed,
-            "weapon_mithril_needed": weapon_mithril_needed,
-            "weapon_lapis_needed": weapon_lapis_needed,
-            "jade_knife_needed": jade_knife_needed,
-            "jade_jade_needed": jade_jade_needed,
-            "extra_points_needed": extra_points_needed,
-            "wood_need_buy": wood_need_buy,
-            "mithril_need_buy": mithril_need_buy,
-            "lapis_need_buy": lapis_need_buy,
-            "knife_need_buy": knife_need_buy,
-            "jade_need_buy": jade_need_buy,
-            "total_points_needed": total_points_needed,
-            "current_points": self.current_points,
-            "points_shortage": points_shortage,
-            "can_upgrade": total_points_needed <= self.current_points,
-            "points_left_after": self.current_points - total_points_needed,
-            "wood_left_after": wood_left_after,
-            "mithril_left_after": mithril_left_after,
-            "lapis_left_after": lapis_left_after,
-            "knife_left_after": knife_left_after,
-            "jade_left_after": jade_left_after
-        }
+# --- 3. 计算输入：页面上的设置整理成不可变输入，由 upgrade_calculator 中的纯函数计算 ---
+# 未填写的数量按 0 计算
+RESOURCES = ResourceSettings(
+    current_points=CURRENT_POINTS if CURRENT_POINTS is not None else 0,
+    current_wood=CURRENT_WOOD if CURRENT_WOOD is not None else 0,
+    current_mithril=CURRENT_MITHRIL if CURRENT_MITHRIL is not None else 0,
+    current_lapis=CURRENT_LAPIS if CURRENT_LAPIS is not None else 0,
+    current_carving_knife=CURRENT_CARVING_KNIFE if CURRENT_CARVING_KNIFE is not None else 0,
+    current_unpolished_jade=CURRENT_UNPOLISHED_JADE if CURRENT_UNPOLISHED_JADE is not None else 0,
+    points_per_wood=POINTS_PER_WOOD,
+    points_per_mithril=POINTS_PER_MITHRIL,
+    points_per_lapis=POINTS_PER_LAPIS,
+    points_per_carving_knife=POINTS_PER_CARVING_KNIFE,
+    points_per_unpolished_jade=POINTS_PER_UNPOLISHED_JADE
+)
+
+UPGRADE_REQUEST = UpgradeRequest(
+    resources=RESOURCES,
+    weapons=tuple((name, levels["current"], levels["target"]) for name, levels in WEAPONS.items()),
+    jades=tuple((name, levels["current"], levels["target"]) for name, levels in JADES.items()),
+    extra_items=tuple((item['name'], item['points_per'], item['times']) for item in st.session_state.extra_items),
+    weapon_cost_index=WEAPON_COST_TABLE,
+    jade_cost_index=JADE_COST_TABLE
+)
 
 # --- 4. 计算并展示结果 ---
 st.header("📊 计算结果（注意兑换1次得到的材料数量不一定是1个）")
@@ -470,25 +275,7 @@ st.info(f"当前使用: **{version}** - {'所有项目单独设置' if version =
 
 if st.button("🚀 开始计算", type="primary", use_container_width=True):
     with st.spinner("正在计算升级需求..."):
-        # 初始化计算器，传入用户输入的动态值
-        calculator = UpgradeCalculator()
-        # 处理None值，确保计算正确
-        calculator.current_points = CURRENT_POINTS if CURRENT_POINTS is not None else 0
-        calculator.current_wood = CURRENT_WOOD if CURRENT_WOOD is not None else 0
-        calculator.current_mithril = CURRENT_MITHRIL if CURRENT_MITHRIL is not None else 0
-        calculator.current_lapis = CURRENT_LAPIS if CURRENT_LAPIS is not None else 0
-        calculator.current_carving_knife = CURRENT_CARVING_KNIFE if CURRENT_CARVING_KNIFE is not None else 0
-        calculator.current_unpolished_jade = CURRENT_UNPOLISHED_JADE if CURRENT_UNPOLISHED_JADE is not None else 0
-        calculator.points_per_wood = POINTS_PER_WOOD
-        calculator.points_per_mithril = POINTS_PER_MITHRIL
-        calculator.points_per_lapis = POINTS_PER_LAPIS
-        calculator.points_per_carving_knife = POINTS_PER_CARVING_KNIFE
-        calculator.points_per_unpolished_jade = POINTS_PER_UNPOLISHED_JADE
-        calculator.weapons = WEAPONS
-        calculator.jades = JADES
-        
-        # 执行计算
-        results = calculator.calculate_all_upgrades()
+        results = calculate_all_upgrades(UPGRADE_REQUEST)
         
     # --- 展示结果 ---
     st.success("计算完成！")
@@ -0,0 +1,97 @@
+# 积分预算曲线：从 0 到当前积分的每个预算下，自动推荐（贪心）一共能升多少级
+# 预算 B 的贪心规划在第一个买不起的一级之前，与不限积分的升级顺序完全相同（前缀），
+# 所以按预算从小到大只沿不限积分的顺序走一遍；每个预算只需在前缀末尾停掉买不起的那一组，
+# 用水位二分补上其余组还能升的级数（与 find_max_levels 的结果相同）
+
+from dataclasses import replace
+
+from cost_tables import WEAPON_MATERIALS
+from upgrade_planner import PLAN_MATERIALS, AutoUpgradeCalculator, UpgradeScheduler
+
+
+def budget_samples(max_budget, budget_step=1000, max_samples=500):
+    """0 到 max_budget 的采样预算：每 budget_step 积分一个点，点数超过 max_samples 时步长取 budget_step 的整数倍放大"""
+    step_count = -(-max_budget // budget_step)
+    multiple = max(1, -(-step_count // max_samples))
+    step = budget_step * multiple
+    budgets = list(range(0, int(max_budget), int(step)))
+    budgets.append(max_budget)
+    return budgets, step
+
+
+def build_budget_curve(inputs, budget_step=1000, max_samples=500):
+    """
+    计算积分预算曲线，返回 {"rows": [...], "breakpoints": [...], "step": 实际采样步长}
+    rows 每个采样预算一行：预算、总升级级数、需要的积分、最先买不起的组（bottleneck，全部满级时为 None）
+    breakpoints 为最先买不起的组发生变化的位置 (预算, 组)：预算达到这里之后，之前买不起的那一组的下一级可以买了，
+    下一个买不起的换成了这一组；预算为不限积分的升级顺序中这一段开始时需要的积分，是精确值
+    """
+    calculator = AutoUpgradeCalculator(inputs)
+    _, _, _, levels = calculator.prepare_level_state()
+    levels = tuple(tuple(list(slot_levels) for slot_levels in kind_levels) for kind_levels in levels)
+    start_total = sum(sum(slot_levels) for kind_levels in levels for slot_levels in kind_levels)
+    cost_indexes = (calculator.weapon_cost_index, calculator.jade_cost_index)
+    material_offsets = (0, len(WEAPON_MATERIALS))
+
+    budgets, step = budget_samples(inputs.resources.current_points, budget_step, max_samples)
+    groups = calculator.upgrade_groups
+    scheduler = UpgradeScheduler(levels, calculator.calculate_normalized_level, groups)
+    need = [0] * len(PLAN_MATERIALS)
+    prefix_steps = 0
+    # 不限积分顺序中当前这一段（同一组连续的升级）开始时需要的积分
+    segment_group, segment_points = None, 0
+
+    rows = []
+    breakpoints = []
+    for budget in budgets:
+        budget_calculator = AutoUpgradeCalculator(replace(inputs, resources=replace(inputs.resources, current_points=budget)))
+
+        # 沿不限积分的顺序前进到这个预算下第一个买不起的一级
+        bottleneck = None
+        while True:
+            next_upgrade = scheduler.peek()
+            if next_upgrade is None:
+                break
+            group_idx, slot, level = next_upgrade
+            kind = groups[group_idx][0]
+            if slot is None or level >= cost_indexes[kind].max_level:
+                # 没有项目或已满级的组与预算无关，直接停掉
+                scheduler.drop_group()
+                continue
+
+            step_need = list(need)
+            for i, cost in enumerate(cost_indexes[kind].level_cost(level)):
+                step_need[material_offsets[kind] + i] += cost
+            if group_idx != segment_group:
+                segment_group, segment_points = group_idx, calculator.calculate_need_points(need)
+            if not budget_calculator.is_need_affordable(step_need):
+                bottleneck = group_idx
+                break
+            need = step_need
+            prefix_steps += 1
+            scheduler.advance()
+
+        if bottleneck is None:
+            total_levels = prefix_steps
+            points_needed = calculator.calculate_need_points(need)
+        else:
+            # 贪心在这里停掉买不起的组，其余组在剩余积分内继续升级
+            final_levels = budget_calculator.solve_max_levels(levels, tuple(need), {bottleneck})
+            final_need = list(need)
+            for group_idx, (kind, troop_idx) in enumerate(groups):
+                for start, final in zip(levels[kind][troop_idx], final_levels[group_idx]):
+                    for i, cost in enumerate(cost_indexes[kind].range_cost(start, final)):
+                        final_need[material_offsets[kind] + i] += cost
+            total_levels = sum(sum(slot_levels) for slot_levels in final_levels) - start_total
+            points_needed = calculator.calculate_need_points(final_need)
+
+        if rows and bottleneck != rows[-1]["bottleneck"]:
+            breakpoints.append((segment_points if bottleneck is not None else points_needed, bottleneck))
+        rows.append({
+            "budget": budget,
+            "total_levels": total_levels,
+            "points_needed": points_needed,
+            "bottleneck": bottleneck
+        })
+
+    return {"rows": rows, "breakpoints": breakpoints, "step": step}
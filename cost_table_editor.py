@@ -0,0 +1,105 @@
+# 页面内的消耗表调整：游戏版本更新后直接在页面里修改单级消耗，不需要重新部署
+# 没有修改时计算器使用进程共享的只读消耗表；第一次修改时为当前会话复制一份树状数组表，
+# 之后每改一行只更新 O(log n) 个节点；交给计算器的是与会话表共用树状数组的只读视图，不复制也不重建
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from cost_tables import (
+    WEAPON_COST_FILE, JADE_COST_FILE, WEAPON_MATERIALS, JADE_MATERIALS,
+    FenwickCostTable, load_upgrade_cost_tables
+)
+from level_catalog import WEAPON_STEP_LABELS, JADE_STEP_LABELS
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_shared_cost_tables(weapon_mtime, jade_mtime):
+    """每个服务进程只读取、校验、构建一次；文件修改时间作为缓存键，文件更新后自动重新读取"""
+    return load_upgrade_cost_tables()
+
+
+def shared_cost_tables():
+    """所有会话共用的只读消耗表 {"weapon": (版本号, CostIndex), "jade": (版本号, CostIndex)}"""
+    return _load_shared_cost_tables(os.path.getmtime(WEAPON_COST_FILE), os.path.getmtime(JADE_COST_FILE))
+
+
+def _reset_cost_table(state_key):
+    """恢复默认消耗表（按钮回调，在组件创建前执行）"""
+    for key in (state_key, f"{state_key}_editor", f"{state_key}_edited_levels"):
+        if key in st.session_state:
+            del st.session_state[key]
+
+
+def render_cost_table_editor(state_key, default_rows, materials, column_labels, level_labels):
+    """
+    渲染可编辑的消耗表，并把改动写入当前会话的树状数组表
+
+    参数:
+    state_key: 会话表在 st.session_state 中的键
+    default_rows: 默认消耗表，每行对应一级
+    materials: 材料名（与 cost_tables 中一致）
+    column_labels: 每种材料在表格中的列名
+    level_labels: 每行的等级说明
+
+    返回:
+    有修改时返回会话自己的 FenwickCostTable，否则返回 None（使用默认表）
+    """
+    default_df = pd.DataFrame([list(row) for row in default_rows], columns=list(column_labels))
+    default_df.insert(0, "等级", list(level_labels))
+
+    edited_df = st.data_editor(
+        default_df,
+        key=f"{state_key}_editor",
+        disabled=["等级"],
+        hide_index=True,
+        num_rows="fixed",
+        use_container_width=True
+    )
+
+    # 只处理本次和上次有改动的行；改回默认值的行也会在这里被恢复
+    edited_levels = {int(row) for row in st.session_state[f"{state_key}_editor"]["edited_rows"]}
+    changed_levels = edited_levels | st.session_state.get(f"{state_key}_edited_levels", set())
+    st.session_state[f"{state_key}_edited_levels"] = edited_levels
+
+    if changed_levels and state_key not in st.session_state:
+        st.session_state[state_key] = FenwickCostTable(default_rows, materials)
+
+    table = st.session_state.get(state_key)
+    for level in sorted(changed_levels):
+        row = []
+        for label, default_value in zip(column_labels, default_rows[level]):
+            value = edited_df.at[level, label]
+            row.append(int(value) if pd.notna(value) else default_value)
+        if tuple(row) != table.level_cost(level):
+            table.update(level, row)
+
+    if table is not None:
+        st.caption("✏️ 当前会话正在使用修改后的消耗表")
+        st.button("↩️ 恢复默认消耗表", key=f"{state_key}_reset", on_click=_reset_cost_table, args=(state_key,))
+
+    return table
+
+
+def render_upgrade_cost_editors():
+    """神兵/玉石消耗表调整区，两个计算器页面共用；返回本次计算使用的只读 (神兵消耗表, 玉石消耗表)"""
+    tables = shared_cost_tables()
+    weapon_version, weapon_index = tables["weapon"]
+    jade_version, jade_index = tables["jade"]
+
+    with st.expander("🛠️ 消耗表调整（游戏版本更新后使用，只影响当前会话）"):
+        st.caption(f"直接修改表格中的数字即可，每行为升一级的消耗（神兵消耗表 v{weapon_version}，玉石消耗表 v{jade_version}）")
+        weapon_tab, jade_tab = st.tabs(["神兵消耗表", "玉石消耗表"])
+        with weapon_tab:
+            weapon_table = render_cost_table_editor(
+                "weapon_cost_table", weapon_index.upgrade_costs, WEAPON_MATERIALS,
+                ["木头", "精金", "青金石"], WEAPON_STEP_LABELS
+            )
+        with jade_tab:
+            jade_table = render_cost_table_editor(
+                "jade_cost_table", jade_index.upgrade_costs, JADE_MATERIALS,
+                ["琢玉刀", "璞玉"], JADE_STEP_LABELS
+            )
+
+    return (weapon_table or weapon_index).snapshot(), (jade_table or jade_index).snapshot()
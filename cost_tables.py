@@ -0,0 +1,211 @@
+# 神兵玉石升级消耗表 + 累计消耗索引
+# 消耗数据保存在 data/ 下带版本号的 JSON 文件中，这里负责读取、校验并构建查询结构；
+# 页面通过 cost_table_editor.shared_cost_tables() 按进程缓存，所有会话共用同一份只读数据
+
+import json
+import os
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+WEAPON_COST_FILE = os.path.join(DATA_DIR, "weapon_upgrade_costs.json")
+JADE_COST_FILE = os.path.join(DATA_DIR, "jade_upgrade_costs.json")
+
+WEAPON_MATERIALS = ("wood", "mithril", "lapis")
+JADE_MATERIALS = ("knife", "jade")
+
+
+class CostIndex:
+    """累计消耗索引：prefix[n] 为 0 级升到 n 级的总消耗，任意区间消耗 O(1) 得到；
+    matrix 为所有区间的消耗矩阵，供批量查询一次花式索引得到"""
+
+    def __init__(self, upgrade_costs, materials):
+        self.materials = tuple(materials)
+        self.max_level = len(upgrade_costs)
+        self.zero_cost = (0,) * len(self.materials)
+        self.upgrade_costs = tuple(tuple(row) for row in upgrade_costs)
+
+        prefix = [self.zero_cost]
+        for row in upgrade_costs:
+            prefix.append(tuple(total + cost for total, cost in zip(prefix[-1], row)))
+        self.prefix = tuple(prefix)
+
+        # 全部 (当前等级, 目标等级) 组合的消耗矩阵，形状 (max_level+1, max_level+1, 材料数)
+        prefix_array = np.array(self.prefix, dtype=np.int64)
+        matrix = prefix_array[np.newaxis, :, :] - prefix_array[:, np.newaxis, :]
+        levels = np.arange(self.max_level + 1)
+        matrix[levels[np.newaxis, :] <= levels[:, np.newaxis]] = 0  # 目标不高于当前的组合没有消耗
+        matrix.setflags(write=False)
+        self.matrix = matrix
+
+    def range_cost(self, current_level, target_level):
+        """从当前等级升到目标等级的各材料消耗，超出消耗表的等级不计"""
+        current_level = max(0, min(current_level, self.max_level))
+        target_level = min(target_level, self.max_level)
+        if target_level <= current_level:
+            return self.zero_cost
+
+        high = self.prefix[target_level]
+        low = self.prefix[current_level]
+        return tuple(h - l for h, l in zip(high, low))
+
+    def level_cost(self, level):
+        """level 级升 level+1 级的消耗"""
+        return self.upgrade_costs[level]
+
+    def batch_range_cost(self, current_levels, target_levels):
+        """批量查询：当前/目标等级数组（任意相同形状）→ 每项消耗，形状末尾多一维材料"""
+        current_levels = np.clip(np.asarray(current_levels, dtype=np.int64), 0, self.max_level)
+        target_levels = np.clip(np.asarray(target_levels, dtype=np.int64), 0, self.max_level)
+        return self.matrix[current_levels, target_levels]
+
+    def snapshot(self):
+        """只读快照：CostIndex 本身不可修改，直接返回自己"""
+        return self
+
+
+
+class FenwickCostView:
+    """树状数组消耗表的只读视图：每种材料各一棵树状数组，区间消耗查询 O(log n)；
+    接口与 CostIndex 相同，计算器可以直接替换使用"""
+
+    def __init__(self, materials, rows, tree, tree_array):
+        self.materials = tuple(materials)
+        self.max_level = len(rows)
+        self.zero_cost = (0,) * len(self.materials)
+        self._rows = rows
+        # tree[i] 保存第 i 个节点覆盖区间的消耗和（下标从 1 开始）；tree_array 为同一份数据的 NumPy 副本，供批量查询使用
+        self._tree = tree
+        self._tree_array = tree_array
+
+    @property
+    def upgrade_costs(self):
+        return tuple(self._rows)
+
+    def level_cost(self, level):
+        """level 级升 level+1 级的消耗"""
+        return self._rows[level]
+
+    def prefix_cost(self, level):
+        """0 级升到 level 级的累计消耗"""
+        total = list(self.zero_cost)
+        i = level
+        while i > 0:
+            total = [t + c for t, c in zip(total, self._tree[i])]
+            i -= i & -i
+        return tuple(total)
+
+    def range_cost(self, current_level, target_level):
+        """从当前等级升到目标等级的各材料消耗，超出消耗表的等级不计"""
+        current_level = max(0, min(current_level, self.max_level))
+        target_level = min(target_level, self.max_level)
+        if target_level <= current_level:
+            return self.zero_cost
+
+        high = self.prefix_cost(target_level)
+        low = self.prefix_cost(current_level)
+        return tuple(h - l for h, l in zip(high, low))
+
+    def _batch_prefix_cost(self, levels):
+        """向量化的前缀查询：所有等级同时沿树向下走，最多 log n 轮"""
+        total = np.zeros(levels.shape + (len(self.materials),), dtype=np.int64)
+        index = levels.copy()
+        while index.any():
+            total += self._tree_array[index]
+            index -= index & -index
+        return total
+
+    def batch_range_cost(self, current_levels, target_levels):
+        """批量查询：当前/目标等级数组（任意相同形状）→ 每项消耗，形状末尾多一维材料"""
+        current_levels = np.clip(np.asarray(current_levels, dtype=np.int64), 0, self.max_level)
+        target_levels = np.clip(np.asarray(target_levels, dtype=np.int64), 0, self.max_level)
+        target_levels = np.maximum(target_levels, current_levels)
+        return self._batch_prefix_cost(target_levels) - self._batch_prefix_cost(current_levels)
+
+    def snapshot(self):
+        """只读视图本身不可修改，直接返回自己"""
+        return self
+
+
+
+class FenwickCostTable(FenwickCostView):
+    """可编辑消耗表：单级修改 O(log n)，修改后无需整表重建。
+    交给计算器的是 snapshot() 得到的只读视图，与表共用同一份树状数组，不复制也不重建；
+    取过视图后第一次修改时表才复制自己的数组（写时复制），视图的内容保持不变"""
+
+    def __init__(self, upgrade_costs, materials):
+        rows = [tuple(row) for row in upgrade_costs]
+        # O(n) 建树
+        tree = [[0] * len(materials)] + [list(row) for row in rows]
+        for i in range(1, len(rows) + 1):
+            parent = i + (i & -i)
+            if parent <= len(rows):
+                tree[parent] = [p + c for p, c in zip(tree[parent], tree[i])]
+        tree_array = np.array(tree, dtype=np.int64).reshape(len(rows) + 1, len(materials))
+        super().__init__(materials, rows, tree, tree_array)
+        self._snapshot = None
+
+    def update(self, level, row):
+        """修改 level 级升 level+1 级的消耗，只更新受影响的 O(log n) 个节点"""
+        row = tuple(row)
+        delta = [new - old for new, old in zip(row, self._rows[level])]
+        if not any(delta):
+            return
+        if self._snapshot is not None:
+            # 数组仍与已交出的视图共用：先复制一份再修改
+            self._rows = list(self._rows)
+            self._tree = list(self._tree)
+            self._tree_array = self._tree_array.copy()
+            self._snapshot = None
+        self._rows[level] = row
+
+        i = level + 1
+        while i <= self.max_level:
+            self._tree[i] = [total + d for total, d in zip(self._tree[i], delta)]
+            self._tree_array[i] += delta
+            i += i & -i
+
+    def snapshot(self):
+        """
+        当前内容的只读视图，交给计算器使用：计算可能在后台线程中进行，不能读到编辑到一半的表；
+        没有修改时重复调用返回同一个对象
+        """
+        if self._snapshot is None:
+            self._tree_array.setflags(write=False)
+            self._snapshot = FenwickCostView(self.materials, self._rows, self._tree, self._tree_array)
+        return self._snapshot
+
+
+
+def load_cost_table(path, materials):
+    """
+    读取并校验一个消耗表文件，返回 (版本号, CostIndex)
+
+    文件格式: {"version": 1, "materials": [...], "costs": [[...], ...]}，
+    costs 第 i 行为 i 级升 i+1 级的消耗，每行数量与 materials 一致且为非负整数
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    version = data.get("version")
+    if not isinstance(version, int):
+        raise ValueError(f"消耗表文件 {path} 缺少整数版本号 version")
+    if tuple(data.get("materials", ())) != tuple(materials):
+        raise ValueError(f"消耗表文件 {path} 的材料应为 {list(materials)}，实际为 {data.get('materials')}")
+
+    costs = data.get("costs")
+    if not costs:
+        raise ValueError(f"消耗表文件 {path} 没有消耗数据")
+    for level, row in enumerate(costs):
+        if len(row) != len(materials) or not all(isinstance(cost, int) and cost >= 0 for cost in row):
+            raise ValueError(f"消耗表文件 {path} 第 {level} 级（{level}→{level + 1}）的消耗无效: {row}")
+
+    return version, CostIndex(costs, materials)
+
+
+def load_upgrade_cost_tables(weapon_path=WEAPON_COST_FILE, jade_path=JADE_COST_FILE):
+    """读取神兵、玉石消耗表，返回 {"weapon": (版本号, CostIndex), "jade": (版本号, CostIndex)}"""
+    return {
+        "weapon": load_cost_table(weapon_path, WEAPON_MATERIALS),
+        "jade": load_cost_table(jade_path, JADE_MATERIALS),
+    }
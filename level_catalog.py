@@ -0,0 +1,55 @@
+# 神兵/玉石等级目录：颜色等级字符串 <-> 数字等级
+# 模块只在进程第一次 import 时构建一次，之后都是 O(1) 的元组下标 / 字典查询
+
+from types import MappingProxyType
+
+UNOWNED_LEVEL_NAME = "未拥有"
+UNKNOWN_LEVEL_NAME = "未知等级"
+
+# 神兵品质分段 (品质, 段内级数)，数字等级按顺序累加：绿1-5、蓝6-10、紫11-20、红21-50
+WEAPON_LEVEL_TIERS = (("绿色", 5), ("蓝色", 5), ("紫色", 10), ("红色", 30))
+
+
+def _build_tier_ranges():
+    """各品质对应的数字等级区间 (品质, 起始等级, 结束等级)"""
+    ranges = []
+    first_level = 1
+    for tier, count in WEAPON_LEVEL_TIERS:
+        ranges.append((tier, first_level, first_level + count - 1))
+        first_level += count
+    return tuple(ranges)
+
+
+WEAPON_TIER_RANGES = _build_tier_ranges()
+
+# 下标即数字等级，可直接作为 selectbox 的选项
+WEAPON_LEVEL_NAMES = (UNOWNED_LEVEL_NAME,) + tuple(
+    f"{tier}{level - first_level + 1}级"
+    for tier, first_level, last_level in WEAPON_TIER_RANGES
+    for level in range(first_level, last_level + 1)
+)
+WEAPON_LEVEL_NUMBERS = MappingProxyType({name: level for level, name in enumerate(WEAPON_LEVEL_NAMES)})
+WEAPON_MAX_LEVEL = len(WEAPON_LEVEL_NAMES) - 1
+
+# 玉石等级 0-25（0级为未激活）
+JADE_MAX_LEVEL = 25
+JADE_LEVEL_OPTIONS = tuple(range(0, JADE_MAX_LEVEL + 1))
+
+# 消耗表每一行对应的升级区间说明（第 i 行为 i 级升 i+1 级）
+WEAPON_STEP_LABELS = tuple(f"{WEAPON_LEVEL_NAMES[level]}→{WEAPON_LEVEL_NAMES[level + 1]}" for level in range(WEAPON_MAX_LEVEL))
+JADE_STEP_LABELS = tuple(f"{level}→{level + 1}" for level in range(JADE_MAX_LEVEL))
+
+
+def weapon_level_number(level_str):
+    """颜色等级字符串 -> 数字等级，无效字符串返回 None"""
+    level = WEAPON_LEVEL_NUMBERS.get(level_str)
+    if level is None:
+        level = WEAPON_LEVEL_NUMBERS.get(level_str.strip())
+    return level
+
+
+def weapon_level_name(level_num):
+    """数字等级 -> 颜色等级字符串"""
+    if 0 <= level_num <= WEAPON_MAX_LEVEL:
+        return WEAPON_LEVEL_NAMES[level_num]
+    return UNKNOWN_LEVEL_NAME
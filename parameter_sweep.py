@@ -0,0 +1,117 @@
+# 等级差 / 玉石百分比参数扫描：对全部 (神兵等级差, 玉石等级差, 玉石百分比) 组合运行自动推荐，按结果排序；
+# 多于两个兵种时，扫描的等级差同时用于基准兵种以外的每个兵种
+# 每个组合只做一次水位二分（不生成逐级升级记录），约 0.3-2 毫秒，全部 3751 个组合单核约 1-7 秒（兵种越多越慢），
+# 所以多核时分给多个工作进程。工作进程用 python -m parameter_sweep 启动，不经过 multiprocessing：
+# Streamlit 把页面脚本注册为 __main__，spawn / forkserver 启动的进程会重新执行页面，在服务进程中 fork 又可能死锁
+
+import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from upgrade_planner import AutoUpgradeCalculator
+
+# 扫描范围与侧边栏输入的范围一致
+SWEEP_WEAPON_LEVEL_DIFFS = tuple(range(0, 11))
+SWEEP_JADE_LEVEL_DIFFS = tuple(range(0, 11))
+SWEEP_JADE_PERCENTAGES = tuple(range(30, 61))
+
+
+def _sweep_chunk(base_inputs, weapon_level_diff, jade_level_diff, jade_percentages):
+    """固定两个等级差，扫描所有玉石百分比，返回每个组合的结果"""
+    other_troops = len(base_inputs.troops) - 1
+    rows = []
+    for jade_percentage in jade_percentages:
+        inputs = replace(
+            base_inputs,
+            weapon_level_offsets=(0,) + (weapon_level_diff,) * other_troops,
+            jade_level_offsets=(0,) + (jade_level_diff,) * other_troops,
+            jade_percentage=jade_percentage
+        )
+        rows.append({"weapon_level_diff": weapon_level_diff, "jade_level_diff": jade_level_diff, **evaluate_settings(inputs)})
+    return rows
+
+
+def evaluate_settings(inputs):
+    """
+    一组设置下贪心推荐的结果摘要（与 find_max_levels 的最终等级相同，但不生成升级记录）：
+    玉石百分比、总升级级数、需要的积分、剩余积分、各组最低等级（按分组顺序）和平衡差距（未满级的组之间归一化等级的最大差）
+    """
+    calculator = AutoUpgradeCalculator(inputs)
+    _, _, _, levels = calculator.prepare_level_state()
+    final_levels = calculator.solve_max_levels(levels)
+
+    cost_indexes = (calculator.weapon_cost_index, calculator.jade_cost_index)
+    need = [[0] * len(cost_index.zero_cost) for cost_index in cost_indexes]
+    final_state = [[()] * len(kind_levels) for kind_levels in levels]
+    total_levels = 0
+    norms = []
+    for group_idx, (kind, troop_idx) in enumerate(calculator.upgrade_groups):
+        final_state[kind][troop_idx] = final_levels[group_idx]
+        for start, final in zip(levels[kind][troop_idx], final_levels[group_idx]):
+            total_levels += final - start
+            for i, cost in enumerate(cost_indexes[kind].range_cost(start, final)):
+                need[kind][i] += cost
+        if final_levels[group_idx] and min(final_levels[group_idx]) < cost_indexes[kind].max_level:
+            norms.append(calculator.calculate_normalized_level(group_idx, min(final_levels[group_idx])))
+
+    points_needed = calculator.calculate_exchange_points(*need)
+    return {
+        "jade_percentage": inputs.jade_percentage,
+        "total_levels": total_levels,
+        "points_needed": points_needed,
+        "points_left": max(0, calculator.current_points - points_needed),
+        "balance_gap": max(norms) - min(norms) if norms else 0,
+        "group_min_levels": calculator.get_min_levels(final_state)
+    }
+
+
+def rank_sweep_results(rows):
+    """排序：总升级级数多的在前，相同时剩余积分多的在前，再相同时平衡差距小的在前"""
+    return sorted(rows, key=lambda row: (-row["total_levels"], -row["points_left"], row["balance_gap"]))
+
+
+def _run_worker(chunk_args):
+    """启动一个工作进程计算若干块，返回这些块的结果；同一进程内的块共用一份 base_inputs（pickle 只传一次）"""
+    completed = subprocess.run(
+        [sys.executable, "-m", "parameter_sweep"], input=pickle.dumps(chunk_args),
+        capture_output=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"参数扫描工作进程失败: {completed.stderr.decode(errors='replace')}")
+    return pickle.loads(completed.stdout)
+
+
+def sweep_settings(base_inputs, workers=None,
+                   weapon_level_diffs=SWEEP_WEAPON_LEVEL_DIFFS,
+                   jade_level_diffs=SWEEP_JADE_LEVEL_DIFFS,
+                   jade_percentages=SWEEP_JADE_PERCENTAGES):
+    """
+    对全部等级差和玉石百分比组合运行推荐，返回排序后的结果列表
+    base_inputs 中的资源、当前等级和消耗表保持不变；workers 为工作进程数（默认 CPU 核数），
+    为 1 时在当前线程中依次计算，不启动进程
+    """
+    chunk_args = [
+        (base_inputs, weapon_level_diff, jade_level_diff, tuple(jade_percentages))
+        for weapon_level_diff in weapon_level_diffs
+        for jade_level_diff in jade_level_diffs
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(chunk_args))
+
+    if workers <= 1:
+        chunks = [_sweep_chunk(*args) for args in chunk_args]
+    else:
+        # 块轮流分给各工作进程，结果按原来的顺序放回（排序相同的组合保持扫描顺序）；线程只用来同时等待多个进程
+        chunks = [None] * len(chunk_args)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_run_worker, [chunk_args[i::workers] for i in range(workers)])
+            for i, worker_chunks in enumerate(results):
+                chunks[i::workers] = worker_chunks
+    return rank_sweep_results([row for chunk in chunks for row in chunk])
+
+
+if __name__ == "__main__":
+    # 工作进程：从标准输入读取块的参数，把结果写到标准输出
+    pickle.dump([_sweep_chunk(*args) for args in pickle.load(sys.stdin.buffer)], sys.stdout.buffer)
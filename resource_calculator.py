@@ -0,0 +1,408 @@
+# 资源包计算核心：单个背包的计算为纯函数，批量计算对多个背包的列数组一次向量化完成
+
+import math
+
+import numpy as np
+
+# 肉、木、煤、铁的目标比例 4:4:2:1，以及一个自选包换成每种资源的比率（换煤得一半、换铁得四分之一）
+RESOURCE_KEYS = ("meat", "wood", "coal", "iron")
+RESOURCE_RATIOS = (4, 4, 2, 1)
+PACK_GAIN_RATES = (1, 1, 0.5, 0.25)
+# 自选包面值（万），按使用顺序从大到小
+PACK_VALUES = (100, 10, 1)
+
+# 分配时按整数个资源比较（1 万 = RESOURCE_UNIT 个），倍数相同时与逐个分配一样按肉、木、煤、铁的顺序，不受浮点误差影响
+RESOURCE_UNIT = 10000
+# 比例倍数乘 4 后的整数权重：资源个数 × 权重 = 比例倍数 × 4 × RESOURCE_UNIT，
+# 这样一个面值为 v 万的包给任何资源带来的增量都是 v × RESOURCE_UNIT
+MULTIPLE_WEIGHTS = (1, 1, 2, 4)
+# 一个 1 万面值的包换成每种资源的个数
+PACK_GAIN_UNITS = (10000, 10000, 5000, 2500)
+
+
+def to_units(amount):
+    """资源量（万）换成整数个资源"""
+    return round(amount * RESOURCE_UNIT)
+
+
+def allocate_packs_by_ratio(units, pack_value, pack_count):
+    """
+    按比例补充：把 pack_count 个面值为 pack_value 的自选包依次补给比例倍数最小的资源（相同时按肉、木、煤、铁的顺序），
+    units 为 [肉, 木, 煤, 铁] 的整数个数，返回补充后的个数。结果与逐个分配相同，但不逐个循环，计算量与包的个数无关
+    
+    一个包给任何资源带来的倍数增量都相同（step），第 i 种资源第 j 次补充前的倍数为 m[i] + j * step，
+    逐个分配就是按 (倍数, 资源顺序) 依次取这些候选中最小的 pack_count 个：
+    - 倍数从低到高，以第 k 低的资源倍数为水位，把低于水位的候选全部分配（每种资源的个数为向上取整）
+    - 包不够填到下一个水位时，参与的资源倍数都落在同一个宽度为 step 的区间内，之后只会按当前倍数的顺序轮流分配，
+      每种资源得到 整除 的轮数，余数给排在前面的几种
+    """
+    step = pack_value * RESOURCE_UNIT
+    multiples = [unit * weight for unit, weight in zip(units, MULTIPLE_WEIGHTS)]
+    counts = [0] * len(units)
+    
+    def current_multiple(i):
+        return multiples[i] + counts[i] * step
+    
+    order = sorted(range(len(units)), key=lambda i: (multiples[i], i))
+    remaining = pack_count
+    for k in range(1, len(order) + 1):
+        if k < len(order):
+            # 低的 k 种资源补到第 k+1 低的倍数需要的包数（整数向上取整）
+            water_level = multiples[order[k]]
+            needed = [max(0, -((current_multiple(i) - water_level) // step)) for i in order[:k]]
+            if sum(needed) <= remaining:
+                for i, count in zip(order[:k], needed):
+                    counts[i] += count
+                remaining -= sum(needed)
+                continue
+        
+        # 轮流分配：按当前倍数（相同时按资源顺序）排在前面的先得到余数
+        rounds, extra = divmod(remaining, k)
+        for rank, i in enumerate(sorted(order[:k], key=lambda i: (current_multiple(i), i))):
+            counts[i] += rounds + (1 if rank < extra else 0)
+        break
+    
+    return [unit + count * pack_value * gain for unit, count, gain in zip(units, counts, PACK_GAIN_UNITS)]
+
+
+def fill_to_multiple(unit, weight, gain, target_multiple, pack_counts):
+    """
+    按顺序补充的一个阶段：从大到小使用自选包补充一种资源（unit 为整数个数，weight、gain 为它的倍数权重和每万包换得的个数），
+    直到倍数 unit × weight 不低于 target_multiple（最后一个包可能超出），返回补充后的个数。
+    pack_counts 为 {面值: 个数}（从大到小），用掉的包直接扣除；每种面值需要的个数由整除得到，与包的个数无关
+    """
+    for pack_value, count in pack_counts.items():
+        if unit * weight >= target_multiple:
+            break
+        used = min(count, -((unit * weight - target_multiple) // (pack_value * RESOURCE_UNIT)))
+        unit += used * pack_value * gain
+        pack_counts[pack_value] = count - used
+    return unit
+
+
+def calculate_resources(meat, wood, coal, iron, pack_1w, pack_10w, pack_100w, strategy_type):
+    """
+    计算包裹内资源总数量（单位：万）
+    提供两种自选包使用策略
+    """
+    # 记录原始资源
+    original_meat, original_wood, original_coal, original_iron = meat, wood, coal, iron
+    
+    # 定义比例
+    RATIO_MEAT, RATIO_WOOD, RATIO_COAL, RATIO_IRON = 4, 4, 2, 1
+    
+    # 负数个数按没有这种包处理
+    pack_1w, pack_10w, pack_100w = max(0, pack_1w), max(0, pack_10w), max(0, pack_100w)
+    
+    # 分配按整数个资源计算
+    start_units = [to_units(amount) for amount in (meat, wood, coal, iron)]
+    units = start_units
+    
+    # 策略1: 按比例补充
+    if strategy_type == 0:  # 按比例补充
+        # 从大到小使用所有自选包（100w优先，1w最后），每种面值一次算完
+        for pack_value, pack_count in ((100, pack_100w), (10, pack_10w), (1, pack_1w)):
+            units = allocate_packs_by_ratio(units, pack_value, pack_count)
+    
+    # 策略2: 按顺序补充
+    else:  # 按顺序补充
+        # 自选包按面值计数（从大到小：100w 优先，1w 最后），每个阶段按面值整除直接算出用掉的个数
+        pack_counts = {100: pack_100w, 10: pack_10w, 1: pack_1w}
+        meat_units, wood_units, coal_units, iron_units = units
+        meat_weight, wood_weight, coal_weight, iron_weight = MULTIPLE_WEIGHTS
+        
+        # 找到最大的比例倍数（按整数权重计算）
+        max_multiple = max(unit * weight for unit, weight in zip(units, MULTIPLE_WEIGHTS))
+        
+        # 阶段1: 补充肉，直到肉的比例倍数等于最大比例倍数
+        # （最后一个包可能超出，超出时肉成为新的最大倍数）
+        meat_units = fill_to_multiple(meat_units, meat_weight, PACK_GAIN_UNITS[0], max_multiple, pack_counts)
+        max_multiple = max(max_multiple, meat_units * meat_weight)
+        
+        # 阶段2: 补充木头，直到木头的比例倍数等于最大比例倍数
+        wood_units = fill_to_multiple(wood_units, wood_weight, PACK_GAIN_UNITS[1], max_multiple, pack_counts)
+        max_multiple = max(max_multiple, wood_units * wood_weight)
+        
+        # 阶段3: 补充煤，直到煤的比例倍数等于最大比例倍数（每个包得到一半的煤）
+        coal_units = fill_to_multiple(coal_units, coal_weight, PACK_GAIN_UNITS[2], max_multiple, pack_counts)
+        max_multiple = max(max_multiple, coal_units * coal_weight)
+        
+        # 阶段4: 补充铁，直到铁的比例倍数等于最大比例倍数（每个包得到四分之一的铁）
+        iron_units = fill_to_multiple(iron_units, iron_weight, PACK_GAIN_UNITS[3], max_multiple, pack_counts)
+        
+        # 阶段5: 如果还有剩余自选包，切换为按比例补充
+        units = [meat_units, wood_units, coal_units, iron_units]
+        for pack_value, pack_count in pack_counts.items():
+            units = allocate_packs_by_ratio(units, pack_value, pack_count)
+    
+    # 补充后的资源量（万）：原有数量加上补充的个数
+    meat, wood, coal, iron = (
+        amount + (unit - start) / RESOURCE_UNIT
+        for amount, unit, start in zip((original_meat, original_wood, original_coal, original_iron), units, start_units)
+    )
+    
+    # 计算最终比例和理想资源量
+    final_min_ratio = min(
+        meat / RATIO_MEAT if RATIO_MEAT > 0 else float('inf'),
+        wood / RATIO_WOOD if RATIO_WOOD > 0 else float('inf'),
+        coal / RATIO_COAL if RATIO_COAL > 0 else float('inf'),
+        iron / RATIO_IRON if RATIO_IRON > 0 else float('inf')
+    )
+    
+    # 计算理想按比例的资源量
+    ideal_meat = final_min_ratio * RATIO_MEAT
+    ideal_wood = final_min_ratio * RATIO_WOOD
+    ideal_coal = final_min_ratio * RATIO_COAL
+    ideal_iron = final_min_ratio * RATIO_IRON
+    
+    # 计算资源过剩情况
+    excess_meat = meat - ideal_meat
+    excess_wood = wood - ideal_wood
+    excess_coal = coal - ideal_coal
+    excess_iron = iron - ideal_iron
+    
+    # 计算每种资源通过自选包实际增加的数量
+    meat_added = meat - original_meat
+    wood_added = wood - original_wood
+    coal_added = coal - original_coal
+    iron_added = iron - original_iron
+    
+    return {
+        'final': {
+            'meat': meat,
+            'wood': wood,
+            'coal': coal,
+            'iron': iron
+        },
+        'original': {
+            'meat': original_meat,
+            'wood': original_wood,
+            'coal': original_coal,
+            'iron': original_iron
+        },
+        'excess': {
+            'meat': excess_meat,
+            'wood': excess_wood,
+            'coal': excess_coal,
+            'iron': excess_iron
+        },
+        'added': {
+            'meat': meat_added,
+            'wood': wood_added,
+            'coal': coal_added,
+            'iron': iron_added
+        },
+        'ideal': {
+            'meat': ideal_meat,
+            'wood': ideal_wood,
+            'coal': ideal_coal,
+            'iron': ideal_iron
+        },
+        'ratio_multiple': final_min_ratio
+    }
+
+
+def batch_allocate_packs_by_ratio(units, pack_value, pack_counts):
+    """
+    allocate_packs_by_ratio 的批量版本：units 为整数个数，形状 (背包数, 4)，pack_counts 形状 (背包数,)，
+    每个背包按同样的水位/轮流分配规则计算，所有背包一起向量化，返回补充后的个数数组
+    """
+    weights = np.array(MULTIPLE_WEIGHTS, dtype=np.int64)
+    gains = np.array(PACK_GAIN_UNITS, dtype=np.int64) * pack_value
+    step = pack_value * RESOURCE_UNIT
+    multiples = units * weights
+    rows = np.arange(len(units))[:, np.newaxis]
+    counts = np.zeros(units.shape, dtype=np.int64)
+    remaining = np.asarray(pack_counts, dtype=np.int64).copy()
+    done = np.zeros(len(units), dtype=bool)
+
+    # 倍数从低到高的资源顺序，相同时按资源顺序（稳定排序）
+    order = np.argsort(multiples, axis=1, kind="stable")
+    for k in range(1, len(MULTIPLE_WEIGHTS) + 1):
+        lower = order[:, :k]
+        current = multiples[rows, lower] + counts[rows, lower] * step
+        if k < len(MULTIPLE_WEIGHTS):
+            # 低的 k 种资源补到第 k+1 低的倍数需要的包数，够用的背包直接补上，进入下一个水位
+            water_levels = multiples[rows[:, 0], order[:, k]]
+            needed = np.maximum(0, -((current - water_levels[:, np.newaxis]) // step))
+            fill = ~done & (needed.sum(axis=1) <= remaining)
+            counts[rows[fill], lower[fill]] += needed[fill]
+            remaining[fill] -= needed[fill].sum(axis=1)
+            round_robin = ~done & ~fill
+        else:
+            round_robin = ~done
+
+        # 轮流分配：按当前倍数（相同时按资源顺序）排在前面的先得到余数
+        if round_robin.any():
+            ranked = np.take_along_axis(
+                lower[round_robin], np.lexsort((lower[round_robin], current[round_robin]), axis=1), axis=1
+            )
+            rounds, extra = np.divmod(remaining[round_robin], k)
+            counts[rows[round_robin], ranked] += rounds[:, np.newaxis] + (np.arange(k) < extra[:, np.newaxis])
+            done |= round_robin
+
+    return units + counts * gains
+
+
+def batch_fill_to_multiple(units, weight, gain, target_multiples, pack_counts):
+    """fill_to_multiple 的批量版本：units、target_multiples 和 pack_counts 中每种面值的个数都是 (背包数,) 整数数组"""
+    for pack_value in PACK_VALUES:
+        count = pack_counts[pack_value]
+        shortfall = target_multiples - units * weight
+        used = np.minimum(count, np.maximum(0, -(-shortfall // (pack_value * RESOURCE_UNIT))))
+        units = units + used * pack_value * gain
+        pack_counts[pack_value] = count - used
+    return units
+
+
+def calculate_resources_batch(meat, wood, coal, iron, pack_1w, pack_10w, pack_100w, strategy_type):
+    """
+    calculate_resources 的批量版本：每个参数为长度相同的列数组（每个背包一行，资源单位：万），
+    一次向量化计算所有背包，返回与 calculate_resources 结构相同的字典，每项为数组
+    """
+    original = np.column_stack([np.asarray(column, dtype=float) for column in (meat, wood, coal, iron)])
+    ratios = np.array(RESOURCE_RATIOS, dtype=float)
+    weights = np.array(MULTIPLE_WEIGHTS, dtype=np.int64)
+    # 负数个数按没有这种包处理
+    pack_counts = {
+        pack_value: np.maximum(0, np.asarray(count, dtype=np.int64))
+        for pack_value, count in zip(PACK_VALUES, (pack_100w, pack_10w, pack_1w))
+    }
+
+    # 分配按整数个资源计算
+    start_units = np.rint(original * RESOURCE_UNIT).astype(np.int64)
+    units = start_units
+    if strategy_type == 1:
+        # 按顺序补充：依次把肉、木、煤、铁补到最大比例倍数，超出时最大倍数随之提高
+        max_multiples = (units * weights).max(axis=1)
+        columns = []
+        for i in range(len(MULTIPLE_WEIGHTS)):
+            column = batch_fill_to_multiple(units[:, i], weights[i], PACK_GAIN_UNITS[i], max_multiples, pack_counts)
+            max_multiples = np.maximum(max_multiples, column * weights[i])
+            columns.append(column)
+        units = np.column_stack(columns)
+
+    # 按比例补充全部自选包（按顺序补充时为剩余的包）
+    for pack_value in PACK_VALUES:
+        units = batch_allocate_packs_by_ratio(units, pack_value, pack_counts[pack_value])
+
+    # 补充后的资源量（万）：原有数量加上补充的个数
+    amounts = original + (units - start_units) / RESOURCE_UNIT
+    ratio_multiple = (amounts / ratios).min(axis=1)
+    ideal = ratio_multiple[:, np.newaxis] * ratios
+    sections = {
+        "final": amounts,
+        "original": original,
+        "excess": amounts - ideal,
+        "added": amounts - original,
+        "ideal": ideal,
+    }
+    result = {
+        section: {key: values[:, i] for i, key in enumerate(RESOURCE_KEYS)}
+        for section, values in sections.items()
+    }
+    result["ratio_multiple"] = ratio_multiple
+    return result
+
+
+def compare_strategies_grid(base_inventory, x_name, x_values, y_name, y_values):
+    """
+    在二维网格上比较两种策略：base_inventory 为 calculate_resources_batch 的参数字典（单个背包），
+    x_name / y_name 为作为横轴、纵轴变化的两个参数，网格上所有背包一次批量计算
+    返回形状 (len(y_values), len(x_values)) 的数组：两种策略的比例倍数和过剩资源总量，以及差值（按比例 - 按顺序）
+    """
+    x_grid, y_grid = np.meshgrid(np.asarray(x_values), np.asarray(y_values))
+    columns = {name: np.full(x_grid.size, value) for name, value in base_inventory.items()}
+    columns[x_name] = x_grid.ravel()
+    columns[y_name] = y_grid.ravel()
+
+    grid = {}
+    for label, strategy_type in (("ratio", 0), ("sequential", 1)):
+        result = calculate_resources_batch(strategy_type=strategy_type, **columns)
+        grid[f"{label}_multiple"] = result["ratio_multiple"].reshape(x_grid.shape)
+        grid[f"{label}_excess"] = sum(result["excess"][key] for key in RESOURCE_KEYS).reshape(x_grid.shape)
+    grid["multiple_diff"] = grid["ratio_multiple"] - grid["sequential_multiple"]
+    grid["excess_diff"] = grid["ratio_excess"] - grid["sequential_excess"]
+    return grid
+
+
+# 反向查询判断是否达到目标比例倍数时允许的相对浮点误差
+TARGET_TOLERANCE = 1e-12
+
+
+def _batch_reaches_target(amounts, pack_counts, target_multiple, strategy_type):
+    """amounts 为一个背包的 (肉, 木, 煤, 铁)，pack_counts 形状 (候选数, 3)，按 100w、10w、1w 排列：每组自选包能否达到目标倍数"""
+    size = len(pack_counts)
+    result = calculate_resources_batch(
+        *(np.full(size, amount) for amount in amounts),
+        pack_counts[:, 2], pack_counts[:, 1], pack_counts[:, 0], strategy_type
+    )
+    return result["ratio_multiple"] >= target_multiple - TARGET_TOLERANCE * max(1.0, abs(target_multiple))
+
+
+def _batch_min_pack_count(amounts, pack_counts, column, target_multiple, strategy_type):
+    """
+    每组候选中第 column 种面值最少需要几个才能达到目标倍数（其余面值个数不变）
+    以只用这种包、按比例补充时的个数为初始上界，不够时倍增，再二分；每一轮所有候选一起批量计算
+    """
+    pack_counts = np.array(pack_counts, dtype=np.int64)
+    step = PACK_VALUES[column] * PACK_GAIN_RATES[0] / RESOURCE_RATIOS[0]
+    # 按比例补充时每种资源补到目标需要的包数之和（水位补充的结果），作为初始上界
+    guess = sum(
+        max(0, math.ceil((target_multiple - amount / ratio) / step))
+        for amount, ratio in zip(amounts, RESOURCE_RATIOS)
+    )
+
+    def reaches(counts):
+        pack_counts[:, column] = counts
+        return _batch_reaches_target(amounts, pack_counts, target_multiple, strategy_type)
+
+    # low 个不够，high 个足够
+    low = np.full(len(pack_counts), -1, dtype=np.int64)
+    high = np.zeros(len(pack_counts), dtype=np.int64)
+    short = ~reaches(high)
+    high[short] = max(1, guess)
+    while short.any():
+        short &= ~reaches(high)
+        low[short] = high[short]
+        high[short] *= 2
+    while (high - low > 1).any():
+        middle = (low + high) // 2
+        enough = reaches(middle)
+        searching = high - low > 1
+        high = np.where(searching & enough, middle, high)
+        low = np.where(searching & ~enough, middle, low)
+    return high
+
+
+def min_packs_for_target(meat, wood, coal, iron, target_multiple, strategy_type):
+    """
+    反向查询：从当前资源（单位：万）出发，按所选策略达到目标比例倍数最少需要的自选包
+    补充的包越多最终倍数越高，所以每种面值的个数都可以二分得到，不逐个模拟补充
+
+    返回:
+    {"single": {面值: 只用这种包时的个数}, "combined": (100w 个数, 10w 个数, 1w 个数)}，
+    combined 为三种包混用时总个数最少的组合（个数相同时总面值少的优先）
+    """
+    amounts = (meat, wood, coal, iron)
+    single = {}
+    for column, pack_value in enumerate(PACK_VALUES):
+        single[pack_value] = int(_batch_min_pack_count(amounts, np.zeros((1, 3)), column, target_multiple, strategy_type)[0])
+
+    # 混用：大包只用 100w 时的个数最多减少资源种类数个（每种资源最多有一个不足整包的零头改用小包），
+    # 对每个 100w 个数同样处理 10w，最后二分 1w 的个数，在所有候选中取总个数最少的
+    candidates = np.zeros((1, 3), dtype=np.int64)
+    for column in range(len(PACK_VALUES)):
+        counts = _batch_min_pack_count(amounts, candidates, column, target_multiple, strategy_type)
+        if column == len(PACK_VALUES) - 1:
+            candidates[:, column] = counts
+            break
+        expanded = []
+        for fewer in range(len(RESOURCE_KEYS) + 1):
+            reduced = candidates.copy()
+            reduced[:, column] = counts - fewer
+            expanded.append(reduced[reduced[:, column] >= 0])
+        candidates = np.concatenate(expanded)
+
+    best = np.lexsort((candidates @ np.array(PACK_VALUES), candidates.sum(axis=1)))[0]
+    return {"single": single, "combined": tuple(int(count) for count in candidates[best])}
@@ -0,0 +1,43 @@
+# 参数扫描的结果与逐个运行自动推荐对照，多进程与单进程结果相同
+# 运行：python -m unittest discover -s tests
+
+import random
+import unittest
+from dataclasses import replace
+
+from parameter_sweep import sweep_settings
+from test_upgrade_planner import random_inputs
+from upgrade_planner import find_max_levels
+
+
+class SweepSettingsTest(unittest.TestCase):
+    def test_rows_match_find_max_levels(self):
+        rng = random.Random(17)
+        for _ in range(5):
+            base_inputs = random_inputs(rng)
+            other_troops = len(base_inputs.troops) - 1
+            rows = sweep_settings(base_inputs, workers=1, weapon_level_diffs=(0, 4, 10),
+                                  jade_level_diffs=(0, 3), jade_percentages=(30, 45, 60))
+            self.assertEqual(len(rows), 18)
+            for row in rows:
+                inputs = replace(
+                    base_inputs,
+                    weapon_level_offsets=(0,) + (row["weapon_level_diff"],) * other_troops,
+                    jade_level_offsets=(0,) + (row["jade_level_diff"],) * other_troops,
+                    jade_percentage=row["jade_percentage"]
+                )
+                result = find_max_levels(inputs)
+                history = result.get("upgrade_history")
+                self.assertEqual(row["total_levels"], history.step_count if history is not None else 0)
+                self.assertAlmostEqual(row["points_needed"], result["points_needed"], delta=1e-6 * max(1, row["points_needed"]))
+                if history is not None:
+                    self.assertEqual(row["group_min_levels"], result["group_min_levels"])
+
+    def test_worker_processes_match_serial(self):
+        base_inputs = random_inputs(random.Random(71))
+        grid = {"weapon_level_diffs": range(0, 11, 2), "jade_level_diffs": range(0, 11, 5), "jade_percentages": range(30, 61, 5)}
+        self.assertEqual(sweep_settings(base_inputs, workers=3, **grid), sweep_settings(base_inputs, workers=1, **grid))
+
+
+if __name__ == "__main__":
+    unittest.main()
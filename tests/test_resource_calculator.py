@@ -0,0 +1,130 @@
+# 资源包分配与原来逐个分配自选包的循环对照（循环用分数精确计算，倍数相同时按肉、木、煤、铁的顺序）
+# 运行：python -m unittest discover -s tests
+
+import random
+import unittest
+from fractions import Fraction
+
+import numpy as np
+
+from resource_calculator import (
+    PACK_VALUES, RESOURCE_KEYS, TARGET_TOLERANCE, calculate_resources, calculate_resources_batch, min_packs_for_target
+)
+
+RATIOS = (4, 4, 2, 1)
+GAIN_RATES = (1, 1, Fraction(1, 2), Fraction(1, 4))
+
+
+def loop_by_ratio(amounts, packs):
+    """原来的按比例补充：每个包补给比例倍数最小的资源"""
+    for pack_value in packs:
+        multiples = [amount / ratio for amount, ratio in zip(amounts, RATIOS)]
+        i = multiples.index(min(multiples))
+        amounts[i] += pack_value * GAIN_RATES[i]
+    return amounts
+
+
+def loop_resources(amounts, pack_1w, pack_10w, pack_100w, strategy_type):
+    """原来的 calculate_resources 分配循环，返回补充后的 [肉, 木, 煤, 铁]"""
+    amounts = [Fraction(amount) for amount in amounts]
+    packs = [100] * pack_100w + [10] * pack_10w + [1] * pack_1w
+    if strategy_type == 0:
+        return loop_by_ratio(amounts, packs)
+
+    max_multiple = max(amount / ratio for amount, ratio in zip(amounts, RATIOS))
+    for i in range(len(amounts)):
+        while packs and amounts[i] / RATIOS[i] < max_multiple:
+            amounts[i] += packs.pop(0) * GAIN_RATES[i]
+            max_multiple = max(max_multiple, amounts[i] / RATIOS[i])
+    return loop_by_ratio(amounts, packs)
+
+
+def random_inventory(rng):
+    """资源量为整数个资源（万，4 位小数），常出现相同的比例倍数"""
+    base = rng.randint(0, 200)
+    amounts = [
+        Fraction(base * ratio * 10000 + rng.choice([0, 0, 1, 5000, rng.randint(0, 2000000)]), 10000)
+        for ratio in RATIOS
+    ]
+    return amounts, rng.randint(0, 120), rng.randint(0, 30), rng.randint(0, 4)
+
+
+class CalculateResourcesTest(unittest.TestCase):
+    def assert_matches_loop(self, amounts, pack_1w, pack_10w, pack_100w, strategy_type):
+        expected = loop_resources(amounts, pack_1w, pack_10w, pack_100w, strategy_type)
+        result = calculate_resources(*(float(amount) for amount in amounts), pack_1w, pack_10w, pack_100w, strategy_type)
+        for key, value in zip(RESOURCE_KEYS, expected):
+            self.assertAlmostEqual(result["final"][key], float(value), places=9, msg=(amounts, key))
+
+    def test_ratio_tie_order(self):
+        # 煤和肉的倍数相同时，逐个分配先给肉
+        self.assert_matches_loop(
+            [Fraction(4, 10), Fraction(2, 10), Fraction(2, 10), Fraction(1, 10)], 49, 19, 1, 0
+        )
+        result = calculate_resources(0.4, 0.2, 0.2, 0.1, 49, 19, 1, 0)
+        self.assertAlmostEqual(result["final"]["meat"], 80.4)
+        self.assertAlmostEqual(result["final"]["iron"], 19.85)
+
+    def test_ratio_matches_loop(self):
+        rng = random.Random(21)
+        for _ in range(300):
+            self.assert_matches_loop(*random_inventory(rng), 0)
+
+    def test_sequential_matches_loop(self):
+        rng = random.Random(22)
+        for _ in range(300):
+            self.assert_matches_loop(*random_inventory(rng), 1)
+        # 补肉时最后一个包超出，超出后的肉成为新的最大倍数
+        self.assert_matches_loop([Fraction(1), Fraction(40), Fraction(5), Fraction(3)], 7, 2, 1, 1)
+
+    def test_batch_matches_single(self):
+        rng = random.Random(7)
+        inventories = [random_inventory(rng) for _ in range(200)]
+        columns = [np.array([float(amounts[i]) for amounts, *_ in inventories]) for i in range(4)]
+        packs = [np.array([inventory[column] for inventory in inventories]) for column in (1, 2, 3)]
+        for strategy_type in (0, 1):
+            batch = calculate_resources_batch(*columns, *packs, strategy_type)
+            for row, (amounts, pack_1w, pack_10w, pack_100w) in enumerate(inventories):
+                single = calculate_resources(*(float(amount) for amount in amounts), pack_1w, pack_10w, pack_100w, strategy_type)
+                for key in RESOURCE_KEYS:
+                    self.assertEqual(batch["final"][key][row], single["final"][key])
+
+
+class MinPacksForTargetTest(unittest.TestCase):
+    def reaches(self, amounts, target_multiple, strategy_type, pack_100w, pack_10w, pack_1w):
+        result = calculate_resources(*amounts, pack_1w, pack_10w, pack_100w, strategy_type)
+        return result["ratio_multiple"] >= target_multiple - TARGET_TOLERANCE * max(1.0, target_multiple)
+
+    def test_single_counts_are_minimal(self):
+        rng = random.Random(25)
+        for _ in range(40):
+            amounts = [round(rng.uniform(0, 3000), 2) for _ in RESOURCE_KEYS]
+            target_multiple, strategy_type = rng.uniform(0, 1500), rng.randrange(2)
+            result = min_packs_for_target(*amounts, target_multiple, strategy_type)
+            for column, pack_value in enumerate(PACK_VALUES):
+                counts = [0, 0, 0]
+                counts[column] = result["single"][pack_value]
+                self.assertTrue(self.reaches(amounts, target_multiple, strategy_type, *counts))
+                if counts[column] > 0:
+                    counts[column] -= 1
+                    self.assertFalse(self.reaches(amounts, target_multiple, strategy_type, *counts))
+            self.assertTrue(self.reaches(amounts, target_multiple, strategy_type, *result["combined"]))
+
+    def test_combined_matches_brute_force(self):
+        rng = random.Random(52)
+        for _ in range(12):
+            amounts = [round(rng.uniform(0, 50), 2) for _ in RESOURCE_KEYS]
+            target_multiple, strategy_type = rng.uniform(0, 30), rng.randrange(2)
+            result = min_packs_for_target(*amounts, target_multiple, strategy_type)
+            # 所有不超过单独使用个数的组合一起批量计算
+            grid = np.stack(np.meshgrid(*(np.arange(result["single"][value] + 1) for value in PACK_VALUES)), -1).reshape(-1, 3)
+            batch = calculate_resources_batch(
+                *(np.full(len(grid), amount) for amount in amounts), grid[:, 2], grid[:, 1], grid[:, 0], strategy_type
+            )
+            enough = grid[batch["ratio_multiple"] >= target_multiple - TARGET_TOLERANCE * max(1.0, target_multiple)]
+            best = min(enough.tolist(), key=lambda counts: (sum(counts), np.dot(counts, PACK_VALUES)))
+            self.assertEqual(list(result["combined"]), best, msg=(amounts, target_multiple, strategy_type))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# 自动推荐的水位二分和热启动与逐级贪心对照（不设迭代上限）
+# 运行：python -m unittest discover -s tests
+
+import random
+import unittest
+from dataclasses import replace
+
+from cost_tables import load_upgrade_cost_tables
+from level_catalog import JADE_MAX_LEVEL, WEAPON_LEVEL_NAMES, WEAPON_MAX_LEVEL
+from upgrade_calculator import ResourceSettings
+from upgrade_planner import ALL_TROOPS, AutoUpgradeCalculator, RecommendationInputs, UpgradePlan, find_max_levels
+
+COST_TABLES = load_upgrade_cost_tables()
+STOCK_FIELDS = ("current_wood", "current_mithril", "current_lapis", "current_carving_knife", "current_unpolished_jade")
+
+
+def random_inputs(rng, simple=False):
+    """随机的兵种、当前等级、积分、库存和等级差；simple 时同一兵种的神兵、玉石等级相同（简略版）"""
+    troops = tuple(rng.sample(ALL_TROOPS, rng.randint(1, len(ALL_TROOPS))))
+    weapons, jades = [], []
+    for troop in troops:
+        weapon_level, jade_level = rng.randint(0, WEAPON_MAX_LEVEL), rng.randint(0, JADE_MAX_LEVEL)
+        for position in ("上", "下"):
+            level = weapon_level if simple else rng.randint(0, WEAPON_MAX_LEVEL)
+            weapons.append((f"{troop}{position}", WEAPON_LEVEL_NAMES[level]))
+            for i in range(1, 5):
+                jades.append((f"{troop}{position}{i}", jade_level if simple else rng.randint(0, JADE_MAX_LEVEL)))
+    resources = ResourceSettings(
+        rng.choice([0, 100, 10000, 1000000, rng.randint(0, 300000)]),
+        *(rng.choice([0, rng.randint(0, 50000)]) for _ in range(5))
+    )
+    return RecommendationInputs(
+        resources, tuple(weapons), tuple(jades), COST_TABLES["weapon"][1], COST_TABLES["jade"][1],
+        troops=troops,
+        weapon_level_offsets=(0,) + tuple(rng.randint(0, 10) for _ in troops[1:]),
+        jade_level_offsets=(0,) + tuple(rng.randint(0, 10) for _ in troops[1:]),
+        jade_percentage=rng.randint(30, 60)
+    )
+
+
+def greedy_levels(inputs):
+    """逐级贪心：每步升级归一化等级最低的组（相同时组顺序靠前）中等级最低、槽位靠前的项目，买不起或满级时该组停止"""
+    calculator = AutoUpgradeCalculator(inputs)
+    _, _, _, levels = calculator.prepare_level_state()
+    cost_indexes = (calculator.weapon_cost_index, calculator.jade_cost_index)
+    slot_levels = [list(levels[kind][troop_idx]) for kind, troop_idx in calculator.upgrade_groups]
+    need = ([0] * 3, [0] * 2)
+    active = set(range(len(slot_levels)))
+    while active:
+        group_idx = min(active, key=lambda g: (calculator.calculate_normalized_level(g, min(slot_levels[g], default=0)), g))
+        kind = calculator.upgrade_groups[group_idx][0]
+        if not slot_levels[group_idx] or min(slot_levels[group_idx]) >= cost_indexes[kind].max_level:
+            active.remove(group_idx)
+            continue
+        level = min(slot_levels[group_idx])
+        step_need = [list(kind_need) for kind_need in need]
+        for i, cost in enumerate(cost_indexes[kind].level_cost(level)):
+            step_need[kind][i] += cost
+        if calculator.calculate_exchange_points(*step_need) > calculator.points_limit:
+            active.remove(group_idx)
+            continue
+        need = step_need
+        slot_levels[group_idx][slot_levels[group_idx].index(level)] += 1
+    return slot_levels, calculator.calculate_exchange_points(*need)
+
+
+def result_summary(result):
+    history = result.get("upgrade_history")
+    rows = history.page_rows(0, len(history)) if history is not None else []
+    return result["weapon_targets"], result["jade_targets"], result["points_needed"], rows
+
+
+class SolveMaxLevelsTest(unittest.TestCase):
+    def test_matches_greedy(self):
+        rng = random.Random(9)
+        for k in range(150):
+            inputs = random_inputs(rng, simple=k % 2 == 0)
+            expected_levels, expected_points = greedy_levels(inputs)
+            calculator = AutoUpgradeCalculator(inputs)
+            _, _, _, levels = calculator.prepare_level_state()
+            self.assertEqual(calculator.solve_max_levels(levels), expected_levels, msg=inputs)
+            result = find_max_levels(inputs)
+            self.assertAlmostEqual(result["points_needed"], expected_points, delta=1e-6 * max(1, expected_points))
+
+    def test_warm_start_matches_cold_start(self):
+        rng = random.Random(90)
+        for k in range(30):
+            inputs = random_inputs(rng, simple=k % 2 == 0)
+            plan = UpgradePlan()
+            for _ in range(6):
+                resources = inputs.resources
+                if rng.random() < 0.6:
+                    points = max(0, resources.current_points + rng.choice([-1, 1]) * rng.choice([10, 1000, 100000]))
+                    resources = replace(resources, current_points=points)
+                else:
+                    resources = replace(resources, **{
+                        field: max(0, getattr(resources, field) + rng.choice([-1000, 0, 1000])) for field in STOCK_FIELDS
+                    })
+                inputs = replace(inputs, resources=resources)
+                self.assertEqual(result_summary(find_max_levels(inputs, plan)), result_summary(find_max_levels(inputs)))
+
+
+if __name__ == "__main__":
+    unittest.main()
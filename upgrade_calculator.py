@@ -0,0 +1,180 @@
+# 升级材料消耗计算：输入为 UpgradeRequest，calculate_all_upgrades 算出全部消耗和需要的积分
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from level_catalog import weapon_level_number
+
+
+@dataclass(frozen=True)
+class ResourceSettings:
+    """积分、材料库存和兑换比例（两个计算器共用），页面上未填写的数量按 0 传入"""
+    current_points: float = 0
+    current_wood: int = 0
+    current_mithril: int = 0
+    current_lapis: int = 0
+    current_carving_knife: int = 0
+    current_unpolished_jade: int = 0
+    points_per_wood: float = 0.1
+    points_per_mithril: float = 2.0
+    points_per_lapis: float = 6.0
+    points_per_carving_knife: float = 30.0
+    points_per_unpolished_jade: float = 6.0
+
+    @property
+    def material_stocks(self):
+        """库存 (木头, 精金, 青金石, 琢玉刀, 璞玉)"""
+        return (
+            self.current_wood, self.current_mithril, self.current_lapis,
+            self.current_carving_knife, self.current_unpolished_jade
+        )
+
+
+@dataclass(frozen=True)
+class UpgradeRequest:
+    """
+    一次材料消耗计算的全部输入
+    weapons: ((神兵名称, 当前颜色等级, 目标颜色等级), ...)
+    jades: ((玉石名称, 当前等级, 目标等级), ...)
+    extra_items: ((物品名称, 单次兑换积分, 兑换次数), ...)
+    """
+    resources: ResourceSettings
+    weapons: tuple
+    jades: tuple
+    extra_items: tuple
+    weapon_cost_index: object
+    jade_cost_index: object
+
+
+def level_str_to_number(level_str):
+    """颜色等级字符串 -> 数字等级，无效字符串抛出 ValueError"""
+    level_num = weapon_level_number(level_str)
+    if level_num is None:
+        raise ValueError(f"无效的等级格式: {level_str}")
+    return level_num
+
+
+def calculate_extra_items(extra_items):
+    """计算额外兑换项目的总积分消耗"""
+    extra_points_needed = 0
+    extra_items_details = []
+
+    for name, points_per, times in extra_items:
+        if name and points_per > 0 and times > 0:
+            item_total = points_per * times
+            extra_points_needed += item_total
+            extra_items_details.append({
+                'name': name,
+                'points_per': points_per,
+                'times': times,
+                'total': item_total
+            })
+
+    return {
+        'extra_points_needed': extra_points_needed,
+        'extra_items_details': extra_items_details
+    }
+
+
+def calculate_all_upgrades(request):
+    """计算全部神兵、玉石和额外兑换的材料需求、需要兑换的材料和积分"""
+    resources = request.resources
+
+    # 计算额外兑换部分
+    extra_results = calculate_extra_items(request.extra_items)
+    extra_points_needed = extra_results['extra_points_needed']
+
+    # 神兵升级计算：所有神兵的等级组成数组，一次批量查询消耗矩阵
+    weapon_currents = np.array([level_str_to_number(current) for _, current, _ in request.weapons], dtype=np.int64)
+    weapon_targets = np.array([level_str_to_number(target) for _, _, target in request.weapons], dtype=np.int64)
+    weapon_costs = request.weapon_cost_index.batch_range_cost(weapon_currents, weapon_targets)
+    weapon_wood_needed, weapon_mithril_needed, weapon_lapis_needed = weapon_costs.sum(axis=0).tolist()
+
+    weapon_results = {}
+    for idx, (weapon_name, current, target) in enumerate(request.weapons):
+        need_upgrade = bool(weapon_targets[idx] > weapon_currents[idx])
+        total_wood_needed, total_mithril_needed, total_lapis_needed = weapon_costs[idx].tolist()
+        weapon_results[weapon_name] = {
+            "current_level": current,
+            "target_level": target,
+            "total_wood_needed": total_wood_needed,
+            "total_mithril_needed": total_mithril_needed,
+            "total_lapis_needed": total_lapis_needed,
+            "levels_upgraded": int(weapon_targets[idx] - weapon_currents[idx]) if need_upgrade else 0,
+            "need_upgrade": need_upgrade
+        }
+
+    # 玉石升级计算：同样一次批量查询
+    jade_currents = np.array([current for _, current, _ in request.jades], dtype=np.int64)
+    jade_targets = np.array([target for _, _, target in request.jades], dtype=np.int64)
+    jade_costs = request.jade_cost_index.batch_range_cost(jade_currents, jade_targets)
+    jade_knife_needed, jade_jade_needed = jade_costs.sum(axis=0).tolist()
+
+    jade_results = {}
+    for idx, (jade_name, current, target) in enumerate(request.jades):
+        need_upgrade = bool(jade_targets[idx] > jade_currents[idx])
+        total_knife_needed, total_jade_needed = jade_costs[idx].tolist()
+        jade_results[jade_name] = {
+            "current_level": current,
+            "target_level": target,
+            "total_knife_needed": total_knife_needed,
+            "total_jade_needed": total_jade_needed,
+            "levels_upgraded": int(jade_targets[idx] - jade_currents[idx]) if need_upgrade else 0,
+            "need_upgrade": need_upgrade
+        }
+
+    # 计算需要购买的材料
+    wood_need_buy = max(0, weapon_wood_needed - resources.current_wood)
+    mithril_need_buy = max(0, weapon_mithril_needed - resources.current_mithril)
+    lapis_need_buy = max(0, weapon_lapis_needed - resources.current_lapis)
+    knife_need_buy = max(0, jade_knife_needed - resources.current_carving_knife)
+    jade_need_buy = max(0, jade_jade_needed - resources.current_unpolished_jade)
+
+    # 计算所需总积分（包括额外兑换）
+    total_points_needed = (
+        wood_need_buy * resources.points_per_wood +
+        mithril_need_buy * resources.points_per_mithril +
+        lapis_need_buy * resources.points_per_lapis +
+        knife_need_buy * resources.points_per_carving_knife +
+        jade_need_buy * resources.points_per_unpolished_jade +
+        extra_points_needed  # 添加额外兑换积分
+    )
+
+    # 计算升级后剩余材料
+    wood_left_after = max(0, resources.current_wood - weapon_wood_needed)
+    mithril_left_after = max(0, resources.current_mithril - weapon_mithril_needed)
+    lapis_left_after = max(0, resources.current_lapis - weapon_lapis_needed)
+    knife_left_after = max(0, resources.current_carving_knife - jade_knife_needed)
+    jade_left_after = max(0, resources.current_unpolished_jade - jade_jade_needed)
+
+    # 检查积分是否足够
+    current_points = resources.current_points
+    points_shortage = max(0, total_points_needed - current_points)
+
+    return {
+        "weapon_results": weapon_results,
+        "jade_results": jade_results,
+        "extra_results": extra_results,
+        "weapon_wood_needed": weapon_wood_needed,
+        "weapon_mithril_needed": weapon_mithril_needed,
+        "weapon_lapis_needed": weapon_lapis_needed,
+        "jade_knife_needed": jade_knife_needed,
+        "jade_jade_needed": jade_jade_needed,
+        "extra_points_needed": extra_points_needed,
+        "wood_need_buy": wood_need_buy,
+        "mithril_need_buy": mithril_need_buy,
+        "lapis_need_buy": lapis_need_buy,
+        "knife_need_buy": knife_need_buy,
+        "jade_need_buy": jade_need_buy,
+        "total_points_needed": total_points_needed,
+        "current_points": current_points,
+        "points_shortage": points_shortage,
+        "can_upgrade": total_points_needed <= current_points,
+        "points_left_after": current_points - total_points_needed,
+        "wood_left_after": wood_left_after,
+        "mithril_left_after": mithril_left_after,
+        "lapis_left_after": lapis_left_after,
+        "knife_left_after": knife_left_after,
+        "jade_left_after": jade_left_after
+    }
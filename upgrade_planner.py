@@ -0,0 +1,805 @@
+# 神兵玉石自动升级推荐：输入为 RecommendationInputs，入口为模块末尾的函数
+
+import bisect
+import heapq
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from cost_tables import WEAPON_MATERIALS, JADE_MATERIALS
+from level_catalog import weapon_level_number
+from upgrade_calculator import ResourceSettings
+
+# 可以参与规划的兵种（每个兵种神兵上下 2 件、玉石上下各 4 块），以及神兵/玉石两个类别
+ALL_TROOPS = ("步兵", "骑兵", "弓兵")
+WEAPON_KIND, JADE_KIND = 0, 1
+KIND_NAMES = ("神兵", "玉石")
+# 规划中累计材料需求的顺序：神兵材料在前，玉石材料在后
+PLAN_MATERIALS = WEAPON_MATERIALS + JADE_MATERIALS
+# 逐步规划时每升多少级报告一次进度
+PLAN_PROGRESS_STEPS = 20
+
+
+def build_upgrade_groups(troop_count):
+    """
+    规划时按 (类别, 兵种) 分组，顺序即归一化等级相同时的升级优先顺序：先各兵种神兵、再各兵种玉石，兵种按输入顺序，
+    如步兵、弓兵时为 步兵神兵、弓兵神兵、步兵玉石、弓兵玉石
+    """
+    return tuple((kind, troop_idx) for kind in (WEAPON_KIND, JADE_KIND) for troop_idx in range(troop_count))
+
+
+def build_group_names(troops):
+    """每组的显示名称，如 "步兵神兵"（按 build_upgrade_groups 的顺序）"""
+    return tuple(f"{troops[troop_idx]}{KIND_NAMES[kind]}" for kind, troop_idx in build_upgrade_groups(len(troops)))
+
+
+@dataclass(frozen=True)
+class RecommendationInputs:
+    """
+    一次自动推荐的全部输入
+    weapons: ((神兵名称, 当前颜色等级), ...)，jades: ((玉石名称, 当前等级), ...)，顺序即等级相同时的升级顺序，
+    名称中包含兵种名，不属于 troops 中任何兵种的项目不参与规划
+    troops: 参与规划的兵种，第一个为基准兵种
+    weapon_level_offsets / jade_level_offsets: 每个兵种（按 troops 顺序）计算归一化等级时加上的等级差，
+    即基准兵种比这个兵种高几级，基准兵种为 0
+    jade_percentage: 玉石等级是神兵最低等级的百分比（整数）
+    """
+    resources: ResourceSettings
+    weapons: tuple
+    jades: tuple
+    weapon_cost_index: object
+    jade_cost_index: object
+    troops: tuple = ("步兵", "弓兵")
+    weapon_level_offsets: tuple = (0, 5)
+    jade_level_offsets: tuple = (0, 2)
+    jade_percentage: int = 40
+
+
+class UpgradeScheduler:
+    """
+    贪心升级顺序的优先队列，每步 O(log n)，与组数、槽位数无关
+    - 组堆按 (归一化等级, 组顺序) 排序：归一化等级最小的组先升级，相同时组顺序靠前的先升级，
+      兵种再多每步也只是组堆上的一次 O(log 组数) 调整
+    - 每组一个槽位堆按 (等级, 槽位顺序) 排序：组内等级最低的先升级，相同时靠前的先升级
+    """
+    
+    def __init__(self, levels, normalize, groups, stopped_groups=()):
+        # levels[类别][兵种][槽位] 会在升级时同步修改；normalize(组, 最低等级) 返回归一化等级
+        # groups 为 build_upgrade_groups 的分组；stopped_groups 为已经停止升级的组，不进入队列
+        self.levels = levels
+        self.normalize = normalize
+        self.groups = groups
+        self.slot_heaps = []
+        self.group_heap = []
+        
+        for group_idx, (kind, troop_idx) in enumerate(groups):
+            slot_heap = [(level, slot) for slot, level in enumerate(levels[kind][troop_idx])]
+            heapq.heapify(slot_heap)
+            self.slot_heaps.append(slot_heap)
+            
+            if group_idx not in stopped_groups:
+                min_level = slot_heap[0][0] if slot_heap else 0
+                self.group_heap.append((normalize(group_idx, min_level), group_idx))
+        heapq.heapify(self.group_heap)
+    
+    def peek(self):
+        """下一步要升级的 (组, 槽位, 当前等级)；组内没有项目时槽位为 None，所有组都已停止时返回 None"""
+        if not self.group_heap:
+            return None
+        
+        group_idx = self.group_heap[0][1]
+        slot_heap = self.slot_heaps[group_idx]
+        if not slot_heap:
+            return group_idx, None, None
+        
+        level, slot = slot_heap[0]
+        return group_idx, slot, level
+    
+    def drop_group(self):
+        """停止升级当前的组（达到最高等级或积分不足）"""
+        heapq.heappop(self.group_heap)
+    
+    def advance(self):
+        """当前组等级最低的槽位升一级，并按新的最低等级调整组的位置"""
+        group_idx = self.group_heap[0][1]
+        slot_heap = self.slot_heaps[group_idx]
+        level, slot = slot_heap[0]
+        
+        kind, troop_idx = self.groups[group_idx]
+        self.levels[kind][troop_idx][slot] = level + 1
+        heapq.heapreplace(slot_heap, (level + 1, slot))
+        heapq.heapreplace(self.group_heap, (self.normalize(group_idx, slot_heap[0][0]), group_idx))
+
+
+class UpgradePlan:
+    """
+    可续算的贪心规划，页面按会话保存，下次计算时热启动：
+    - key：决定升级顺序的输入（当前等级、等级差、玉石百分比、消耗表），变化时从头规划
+    - 逐级升级记录（按列存储）：组、槽位、起始等级，以及这一步之后的累计材料需求（按 PLAN_MATERIALS 顺序）；
+      同一项目连续的升级合并为一段，run_starts 为每段第一步的位置
+    - drops：积分不足而停止升级的组 (停在第几步之前, 组, 再升一级后的累计材料需求)
+    积分或库存变化时只需找到第一个结果不同的位置，回滚之后的记录再从那里续算，
+    耗时与变化的部分成正比，而不是与整个规划成正比
+    """
+    
+    def __init__(self):
+        self.key = None
+        self.item_names = None
+        self.levels = None
+        self.groups = None
+        self.step_groups = []
+        self.step_slots = []
+        self.step_levels = []
+        self.step_needs = []
+        self.run_starts = []
+        self.drops = []
+    
+    def reset(self, key, item_names, levels, groups):
+        """丢弃之前的规划，从当前等级重新开始"""
+        self.__init__()
+        self.key = key
+        self.item_names = item_names
+        self.levels = levels
+        self.groups = groups
+    
+    @property
+    def total_need(self):
+        """目前所有升级的累计材料需求"""
+        return self.step_needs[-1] if self.step_needs else (0,) * len(PLAN_MATERIALS)
+    
+    def add_step(self, group_idx, slot, level, need):
+        if not self.step_groups or (self.step_groups[-1], self.step_slots[-1]) != (group_idx, slot):
+            self.run_starts.append(len(self.step_groups))
+        self.step_groups.append(group_idx)
+        self.step_slots.append(slot)
+        self.step_levels.append(level)
+        self.step_needs.append(need)
+    
+    def rollback(self, position, drop_count):
+        """撤销第 position 步及之后的升级（从后往前恢复等级），只保留前 drop_count 个停止记录"""
+        for i in range(len(self.step_groups) - 1, position - 1, -1):
+            kind, troop_idx = self.groups[self.step_groups[i]]
+            self.levels[kind][troop_idx][self.step_slots[i]] = self.step_levels[i]
+        del self.step_groups[position:]
+        del self.step_slots[position:]
+        del self.step_levels[position:]
+        del self.step_needs[position:]
+        del self.run_starts[bisect.bisect_left(self.run_starts, position):]
+        del self.drops[drop_count:]
+
+
+class UpgradeHistory:
+    """
+    升级顺序详情的紧凑记录：复制规划中按列存储的逐级记录，同一项目连续的升级合并为一行，
+    表格只在显示某一页时才生成这一页的行
+    """
+    
+    def __init__(self, plan, calculate_points):
+        # calculate_points(累计材料需求) 返回兑换所需积分，用于计算每一行消耗的积分
+        self.item_names = plan.item_names
+        self.groups = plan.groups
+        self.step_groups = tuple(plan.step_groups)
+        self.step_slots = tuple(plan.step_slots)
+        self.step_levels = tuple(plan.step_levels)
+        self.step_needs = tuple(plan.step_needs)
+        self.run_starts = tuple(plan.run_starts)
+        self.calculate_points = calculate_points
+    
+    def __len__(self):
+        """合并后的行数"""
+        return len(self.run_starts)
+    
+    @property
+    def step_count(self):
+        """升级的总级数"""
+        return len(self.step_groups)
+    
+    def page_rows(self, page, page_size):
+        """第 page 页（从 0 开始）的表格行"""
+        rows = []
+        first_run = page * page_size
+        for run in range(first_run, min(first_run + page_size, len(self.run_starts))):
+            start = self.run_starts[run]
+            end = self.run_starts[run + 1] if run + 1 < len(self.run_starts) else len(self.step_groups)
+            kind, troop_idx = self.groups[self.step_groups[start]]
+            points_before = self.calculate_points(self.step_needs[start - 1]) if start > 0 else 0
+            rows.append({
+                "序号": run + 1,
+                "升级项目": self.item_names[kind][troop_idx][self.step_slots[start]],
+                "类型": KIND_NAMES[kind],
+                "从等级": self.step_levels[start],
+                "到等级": self.step_levels[end - 1] + 1,
+                "消耗积分": f"{self.calculate_points(self.step_needs[end - 1]) - points_before:.1f}"
+            })
+        return rows
+
+
+class AutoUpgradeCalculator:
+    """
+    自动推荐的计算核心：所有属性在构造时由 RecommendationInputs 得到，之后不再修改；会被修改的只有调用方传入的 UpgradePlan
+    """
+    
+    def __init__(self, inputs):
+        self.inputs = inputs
+        resources = inputs.resources
+        
+        # 当前资源
+        self.current_points = resources.current_points
+        self.current_wood = resources.current_wood
+        self.current_mithril = resources.current_mithril
+        self.current_lapis = resources.current_lapis
+        self.current_carving_knife = resources.current_carving_knife
+        self.current_unpolished_jade = resources.current_unpolished_jade
+        
+        self.material_stocks = resources.material_stocks
+        
+        # 积分恰好用完时，逐级累加与一次性计算的浮点误差可能不同，按相对误差 1e-9 视为买得起
+        self.points_limit = self.current_points + 1e-9 * max(1, self.current_points)
+        
+        # 兑换比例
+        self.points_per_wood = resources.points_per_wood
+        self.points_per_mithril = resources.points_per_mithril
+        self.points_per_lapis = resources.points_per_lapis
+        self.points_per_carving_knife = resources.points_per_carving_knife
+        self.points_per_unpolished_jade = resources.points_per_unpolished_jade
+        
+        # 当前等级数据 ((名称, 当前等级), ...)
+        self.weapons = inputs.weapons
+        self.jades = inputs.jades
+        
+        # 参与规划的兵种及分组
+        self.troops = inputs.troops
+        self.upgrade_groups = build_upgrade_groups(len(self.troops))
+        
+        # 每个兵种计算归一化等级时加上的等级差（按 troops 顺序，基准兵种为 0）
+        self.weapon_level_offsets = inputs.weapon_level_offsets
+        self.jade_level_offsets = inputs.jade_level_offsets
+        
+        # 玉石百分比设置
+        self.jade_percentage = inputs.jade_percentage / 100.0  # 转换为小数
+        
+        # 消耗表：只读的累计消耗索引（页面中修改过则为会话表的只读视图）
+        self.weapon_cost_index = inputs.weapon_cost_index
+        self.jade_cost_index = inputs.jade_cost_index
+    
+    def level_str_to_number(self, level_str):
+        """将颜色等级字符串转换为数字等级（查等级目录，无效字符串按未拥有处理）"""
+        level_num = weapon_level_number(level_str)
+        return level_num if level_num is not None else 0
+    
+    def build_level_state(self, weapon_nums, jade_nums):
+        """
+        把按名称存储的等级整理成定长数组：levels[类别][兵种][槽位]，
+        槽位顺序与输入字典一致（等级相同时靠前的先升级），名称只在这里匹配一次
+        """
+        names = tuple(tuple([] for _ in self.troops) for _ in (WEAPON_KIND, JADE_KIND))
+        levels = tuple(tuple([] for _ in self.troops) for _ in (WEAPON_KIND, JADE_KIND))
+        
+        for kind, level_nums in ((WEAPON_KIND, weapon_nums), (JADE_KIND, jade_nums)):
+            for item_name, level in level_nums.items():
+                for troop_idx, troop in enumerate(self.troops):
+                    if troop in item_name:
+                        names[kind][troop_idx].append(item_name)
+                        levels[kind][troop_idx].append(level)
+                        break
+        
+        return names, levels
+    
+    def get_min_levels(self, levels):
+        """每组（各兵种的神兵、玉石）的最低等级，按分组顺序"""
+        return tuple(min(levels[kind][troop_idx], default=0) for kind, troop_idx in self.upgrade_groups)
+    
+    def calculate_normalized_level(self, group_idx, min_level):
+        """计算一组的归一化等级：神兵换算成等效玉石等级，各兵种加上自己的等级差"""
+        kind, troop_idx = self.upgrade_groups[group_idx]
+        if kind == WEAPON_KIND:
+            # 公式：等效玉石等级 = (神兵等级 + 等级差) × 百分比
+            return (min_level + self.weapon_level_offsets[troop_idx]) * self.jade_percentage
+        # 玉石等级直接使用（已经是玉石等级）
+        return min_level + self.jade_level_offsets[troop_idx]
+    
+    def calculate_exchange_points(self, weapon_need, jade_need):
+        """神兵材料 (木头, 精金, 青金石) 和玉石材料 (琢玉刀, 璞玉) 总需求扣除库存后需要兑换的积分"""
+        wood_needed, mithril_needed, lapis_needed = weapon_need
+        knife_needed, jade_needed = jade_need
+        return (
+            max(0, wood_needed - self.current_wood) * self.points_per_wood +
+            max(0, mithril_needed - self.current_mithril) * self.points_per_mithril +
+            max(0, lapis_needed - self.current_lapis) * self.points_per_lapis
+        ) + (
+            max(0, knife_needed - self.current_carving_knife) * self.points_per_carving_knife +
+            max(0, jade_needed - self.current_unpolished_jade) * self.points_per_unpolished_jade
+        )
+    
+    def calculate_need_points(self, need):
+        """累计材料需求（按 PLAN_MATERIALS 顺序）扣除库存后需要兑换的积分"""
+        return self.calculate_exchange_points(need[:len(WEAPON_MATERIALS)], need[len(WEAPON_MATERIALS):])
+    
+    def build_level_classes(self, slot_levels):
+        """组内等级相同的槽位合并为一类：按等级排序的 ((等级, 个数), ...)"""
+        return tuple(sorted(Counter(slot_levels).items()))
+    
+    def solve_max_levels(self, levels, base_need=None, stopped_groups=()):
+        """
+        水位二分求解每个槽位的最终等级（按 self.upgrade_groups 顺序），不设迭代上限，
+        结果与逐级贪心在不限迭代次数时相同：
+        - 贪心每步升级归一化等级最低的组，等价于按 (归一化等级, 组顺序) 依次完成各组的"一层"
+          （组内最低等级的槽位全部升一级），归一化等级使用玉石百分比和等级差
+        - 总积分只取决于最终等级（库存先抵扣，不足部分兑换），并随完成的层数单调增加，所以可以二分能完成多少层
+        - 停下的那一层按槽位顺序升级，二分能升几个槽位，之后该组停止升级（与贪心相同），其余组继续二分
+        组内等级相同的槽位按一类乘以个数计算，简略版每组只有一类，代价与每兵种一把神兵、一块玉石相同；
+        每轮 O(log 层数) 次求值，最多轮数等于组数
+        热启动时 levels 为续算位置的等级，base_need 为此前的累计材料需求，stopped_groups 中的组保持不动
+        """
+        cost_indexes = (self.weapon_cost_index, self.jade_cost_index)
+        max_levels = (self.weapon_cost_index.max_level, self.jade_cost_index.max_level)
+        group_classes = [self.build_level_classes(levels[kind][troop_idx]) for kind, troop_idx in self.upgrade_groups]
+        
+        # 仍在升级的组的水位：组内低于水位的槽位都升到水位
+        water = {}
+        for group_idx, (kind, _) in enumerate(self.upgrade_groups):
+            if group_idx in stopped_groups:
+                continue
+            if group_classes[group_idx] and group_classes[group_idx][0][0] < max_levels[kind]:
+                water[group_idx] = group_classes[group_idx][0][0]
+        
+        # 已停止升级的组：最终水位、停下那一层升级的槽位个数，以及这些组的材料需求 (神兵, 玉石)
+        final_water = {}
+        partial_counts = {}
+        if base_need is None:
+            base_need = (0,) * len(PLAN_MATERIALS)
+        fixed_need = (list(base_need[:len(WEAPON_MATERIALS)]), list(base_need[len(WEAPON_MATERIALS):]))
+        
+        def add_group_need(need, group_idx, water_level, partial_count=0):
+            """一组升到水位（再加上停下那一层的 partial_count 个槽位）的材料需求累加到 need"""
+            kind = self.upgrade_groups[group_idx][0]
+            for class_level, count in group_classes[group_idx]:
+                if class_level >= water_level:
+                    break
+                for i, cost in enumerate(cost_indexes[kind].range_cost(class_level, water_level)):
+                    need[kind][i] += cost * count
+            if partial_count:
+                for i, cost in enumerate(cost_indexes[kind].level_cost(water_level)):
+                    need[kind][i] += cost * partial_count
+        
+        def is_affordable(water_levels, partial=None):
+            need = (list(fixed_need[WEAPON_KIND]), list(fixed_need[JADE_KIND]))
+            for group_idx, water_level in water_levels.items():
+                add_group_need(need, group_idx, water_level)
+            if partial is not None:
+                add_group_need(need, *partial)
+            return self.calculate_exchange_points(*need) <= self.points_limit
+        
+        def water_before(layer):
+            """完成排在 layer 之前的所有层后各组的水位（每组内二分）"""
+            water_levels = {}
+            for group_idx, water_level in water.items():
+                low, high = water_level, max_levels[self.upgrade_groups[group_idx][0]]
+                while low < high:
+                    mid = (low + high) // 2
+                    if (self.calculate_normalized_level(group_idx, mid), group_idx) < layer:
+                        low = mid + 1
+                    else:
+                        high = mid
+                water_levels[group_idx] = low
+            return water_levels
+        
+        while water:
+            # 所有组剩余的层，按贪心顺序排列：(归一化等级, 组顺序, 等级)
+            layers = sorted(
+                (self.calculate_normalized_level(group_idx, level), group_idx, level)
+                for group_idx, water_level in water.items()
+                for level in range(water_level, max_levels[self.upgrade_groups[group_idx][0]])
+            )
+            
+            def water_after(layer_count):
+                if layer_count == len(layers):
+                    return {group_idx: max_levels[self.upgrade_groups[group_idx][0]] for group_idx in water}
+                return water_before(layers[layer_count][:2])
+            
+            # 二分能完整完成的层数（0 层即当前状态，一定买得起）
+            low, high = 0, len(layers)
+            while low < high:
+                mid = (low + high + 1) // 2
+                if is_affordable(water_after(mid)):
+                    low = mid
+                else:
+                    high = mid - 1
+            
+            water = water_after(low)
+            if low == len(layers):
+                break
+            
+            # 下一层买不起：二分这一层能按槽位顺序升几个（一定少于整层），之后该组停止升级
+            _, group_idx, level = layers[low]
+            del water[group_idx]
+            layer_size = sum(count for class_level, count in group_classes[group_idx] if class_level <= level)
+            low, high = 0, layer_size - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if is_affordable(water, (group_idx, level, mid)):
+                    low = mid
+                else:
+                    high = mid - 1
+            
+            final_water[group_idx] = level
+            partial_counts[group_idx] = low
+            add_group_need(fixed_need, group_idx, level, low)
+        
+        final_water.update(water)
+        
+        # 展开成每个槽位的最终等级：低于水位的升到水位，停下那一层按槽位顺序升前几个
+        final_levels = []
+        for group_idx, (kind, troop_idx) in enumerate(self.upgrade_groups):
+            water_level = final_water.get(group_idx, 0)
+            slot_levels = [max(level, water_level) for level in levels[kind][troop_idx]]
+            partial_count = partial_counts.get(group_idx, 0)
+            for slot, level in enumerate(slot_levels):
+                if partial_count == 0:
+                    break
+                if level == water_level:
+                    slot_levels[slot] = level + 1
+                    partial_count -= 1
+            final_levels.append(slot_levels)
+        
+        return final_levels
+    
+    def build_group_steps(self, start_levels, group_idx):
+        """
+        一组按组内顺序（等级最低、槽位靠前的先升）逐级升到满级，
+        返回第 n 步后的 (槽位等级, 该组材料需求)，n = 0..可升的总级数
+        """
+        kind = self.upgrade_groups[group_idx][0]
+        cost_index = (self.weapon_cost_index, self.jade_cost_index)[kind]
+        slot_levels = list(start_levels[group_idx])
+        slot_heap = [(level, slot) for slot, level in enumerate(slot_levels)]
+        heapq.heapify(slot_heap)
+        
+        need = list(cost_index.zero_cost)
+        steps = [(tuple(slot_levels), tuple(need))]
+        while slot_heap and slot_heap[0][0] < cost_index.max_level:
+            level, slot = slot_heap[0]
+            need = [total + cost for total, cost in zip(need, cost_index.level_cost(level))]
+            slot_levels[slot] = level + 1
+            heapq.heapreplace(slot_heap, (level + 1, slot))
+            steps.append((tuple(slot_levels), tuple(need)))
+        return steps
+    
+    def find_exact_levels(self, time_limit, cancel_event=None):
+        """
+        精确模式（分支定界）：在积分和库存限制下最大化总共提升的等级数，
+        超过 time_limit 秒或 cancel_event 被设置时返回已找到的最好方案
+        - 组内仍按等级最低、槽位靠前的顺序升级；每组只需决定升几级
+        - 组间平衡作为约束：未满级的组之间归一化等级的差距不超过贪心方案的差距（至少允许相差一级），
+          所以贪心方案一定可行，作为初始下界
+        - 上界：已决定的组的级数 + 其余每组在剩余积分下单独能升的最多级数
+        返回与 find_max_levels 相同格式的结果，另加 "exact_info"：与贪心方案的比较、是否已证明最优、上界和耗时
+        """
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit
+        _, _, item_names, levels = self.prepare_level_state()
+        start_levels = [list(levels[kind][troop_idx]) for kind, troop_idx in self.upgrade_groups]
+        max_levels = (self.weapon_cost_index.max_level, self.jade_cost_index.max_level)
+        
+        # 每组升 n 级后的槽位等级、材料需求、归一化等级（满级的组不参与平衡约束，记为 None）
+        group_steps = [self.build_group_steps(start_levels, group_idx) for group_idx in range(len(self.upgrade_groups))]
+        group_norms = []
+        for group_idx, steps in enumerate(group_steps):
+            kind = self.upgrade_groups[group_idx][0]
+            norms = []
+            for slot_levels, _ in steps:
+                min_level = min(slot_levels, default=max_levels[kind])
+                norms.append(self.calculate_normalized_level(group_idx, min_level) if min_level < max_levels[kind] else None)
+            group_norms.append(norms)
+        
+        def norm_spread(counts):
+            norms = [group_norms[group_idx][n] for group_idx, n in enumerate(counts)]
+            norms = [norm for norm in norms if norm is not None]
+            return max(norms) - min(norms) if norms else 0
+        
+        # 贪心方案作为初始解
+        greedy_levels = self.solve_max_levels(levels)
+        greedy_counts = [sum(final) - sum(start) for final, start in zip(greedy_levels, start_levels)]
+        max_spread = max(norm_spread(greedy_counts), 1) + 1e-9
+        best = {"counts": greedy_counts, "total": sum(greedy_counts)}
+        
+        def add_need(weapon_need, jade_need, group_idx, n):
+            need = group_steps[group_idx][n][1]
+            if self.upgrade_groups[group_idx][0] == WEAPON_KIND:
+                return tuple(a + b for a, b in zip(weapon_need, need)), jade_need
+            return weapon_need, tuple(a + b for a, b in zip(jade_need, need))
+        
+        def max_affordable(group_idx, weapon_need, jade_need):
+            """在已决定的需求之上，这一组单独最多还能升几级（积分随级数单调增加，二分）"""
+            low, high = 0, len(group_steps[group_idx]) - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if self.calculate_exchange_points(*add_need(weapon_need, jade_need, group_idx, mid)) <= self.points_limit:
+                    low = mid
+                else:
+                    high = mid - 1
+            return low
+        
+        search_groups = [group_idx for group_idx, steps in enumerate(group_steps) if len(steps) > 1]
+        counts = [0] * len(self.upgrade_groups)
+        timed_out = False
+        
+        def search(depth, weapon_need, jade_need, total, low_norm, high_norm):
+            nonlocal timed_out
+            if time.perf_counter() > deadline or (cancel_event is not None and cancel_event.is_set()):
+                timed_out = True
+                return
+            if depth == len(search_groups):
+                if total > best["total"]:
+                    best["counts"], best["total"] = counts.copy(), total
+                return
+            
+            limits = [max_affordable(group_idx, weapon_need, jade_need) for group_idx in search_groups[depth:]]
+            rest_bound = sum(limits[1:])
+            group_idx = search_groups[depth]
+            for n in range(limits[0], -1, -1):
+                if total + n + rest_bound <= best["total"]:
+                    break
+                norm = group_norms[group_idx][n]
+                if norm is not None:
+                    new_low, new_high = min(low_norm, norm), max(high_norm, norm)
+                    if new_high - new_low > max_spread:
+                        continue
+                else:
+                    new_low, new_high = low_norm, high_norm
+                counts[group_idx] = n
+                search(depth + 1, *add_need(weapon_need, jade_need, group_idx, n), total + n, new_low, new_high)
+                counts[group_idx] = 0
+                if timed_out:
+                    return
+        
+        weapon_zero, jade_zero = self.weapon_cost_index.zero_cost, self.jade_cost_index.zero_cost
+        upper_bound = sum(max_affordable(group_idx, weapon_zero, jade_zero) for group_idx in search_groups)
+        search(0, weapon_zero, jade_zero, 0, float("inf"), float("-inf"))
+        
+        final_levels = [list(group_steps[group_idx][n][0]) for group_idx, n in enumerate(best["counts"])]
+        plan = UpgradePlan()
+        plan.reset(None, item_names, levels, self.upgrade_groups)
+        self.extend_plan(plan, final_levels)
+        result = self.build_plan_result(plan)
+        result["exact_info"] = {
+            "greedy_levels": sum(greedy_counts),
+            "exact_levels": best["total"],
+            "gap": best["total"] - sum(greedy_counts),
+            "optimal": not timed_out,
+            "upper_bound": best["total"] if not timed_out else upper_bound,
+            "elapsed": time.perf_counter() - start_time
+        }
+        return result
+    
+    def prepare_level_state(self):
+        """把输入的等级转换为数字，并整理成规划用的定长数组"""
+        # 将当前等级转换为数字并存储
+        weapon_current_nums = {}
+        for weapon_name, level_str in self.weapons:
+            weapon_current_nums[weapon_name] = self.level_str_to_number(level_str)
+        
+        jade_current_nums = {}
+        for jade_name, level in self.jades:
+            jade_current_nums[jade_name] = level
+        
+        item_names, levels = self.build_level_state(weapon_current_nums, jade_current_nums)
+        return weapon_current_nums, jade_current_nums, item_names, levels
+    
+    def plan_key(self, item_names, levels):
+        """决定升级顺序的输入：兵种、当前等级、等级差、玉石百分比和消耗表；相同时上一次的规划可以热启动"""
+        return (
+            self.troops, item_names,
+            tuple(tuple(tuple(slot_levels) for slot_levels in kind_levels) for kind_levels in levels),
+            self.weapon_level_offsets, self.jade_level_offsets, self.jade_percentage,
+            self.weapon_cost_index.upgrade_costs, self.jade_cost_index.upgrade_costs
+        )
+    
+    def find_max_levels(self, plan=None):
+        """
+        按照新逻辑寻找在当前资源下能达到的最高等级
+        传入本会话上一次的 UpgradePlan 时从它热启动（原地更新），否则从头规划
+        """
+        if plan is None:
+            plan = UpgradePlan()
+        for _ in self.iter_max_levels(plan):
+            pass
+        return self.build_plan_result(plan)
+    
+    def iter_max_levels(self, plan):
+        """
+        find_max_levels 的生成器版本，规划过程中不断产出进度（见 get_plan_progress）；
+        plan 在两次产出之间始终是完整的部分方案，可以随时停止并直接采用
+        """
+        _, _, item_names, levels = self.prepare_level_state()
+        
+        # 决定升级顺序的输入没变时，只回滚/续算积分和库存变化影响到的部分
+        key = self.plan_key(item_names, levels)
+        if plan.key != key:
+            plan.reset(key, item_names, levels, self.upgrade_groups)
+        else:
+            plan.rollback(*self.find_plan_divergence(plan))
+        
+        yield from self.iter_extend_plan(plan)
+    
+    def get_plan_progress(self, plan):
+        """规划进度：已规划的升级级数、需要的积分、各兵种神兵/玉石当前的最低等级"""
+        return {
+            "step_count": len(plan.step_groups),
+            "points_needed": self.calculate_need_points(plan.total_need),
+            "min_levels": self.get_min_levels(plan.levels)
+        }
+    
+    def is_need_affordable(self, need):
+        """累计材料需求兑换所需的积分是否足够"""
+        return self.calculate_need_points(need) <= self.points_limit
+    
+    def find_plan_divergence(self, plan):
+        """
+        按当前的积分和库存，找到上一次规划中第一个结果不同的位置，返回 (步数, 保留的停止记录个数)
+        - 积分或库存减少：累计需求单调增加，二分出第一步买不起的位置
+        - 积分或库存增加：在这之前第一个现在买得起的停止记录
+        """
+        low, high = 0, len(plan.step_needs)
+        while low < high:
+            mid = (low + high) // 2
+            if self.is_need_affordable(plan.step_needs[mid]):
+                low = mid + 1
+            else:
+                high = mid
+        
+        for drop_idx, (drop_position, _, drop_need) in enumerate(plan.drops):
+            if drop_position > low:
+                return low, drop_idx
+            if self.is_need_affordable(drop_need):
+                return drop_position, drop_idx
+        return low, len(plan.drops)
+    
+    def extend_plan(self, plan, final_levels=None):
+        """从规划的当前位置一直续算到结束"""
+        for _ in self.iter_extend_plan(plan, final_levels):
+            pass
+    
+    def iter_extend_plan(self, plan, final_levels=None):
+        """
+        从规划的当前位置续算：水位二分求出最终等级（或使用给定的 final_levels），
+        再按贪心顺序逐级记录升级和累计材料需求，积分不足而停止的组记入 drops；
+        每记录 PLAN_PROGRESS_STEPS 级及结束时产出一次进度
+        """
+        cost_indexes = (self.weapon_cost_index, self.jade_cost_index)
+        material_offsets = (0, len(WEAPON_MATERIALS))
+        stopped_groups = {group_idx for _, group_idx, _ in plan.drops}
+        if final_levels is None:
+            final_levels = self.solve_max_levels(plan.levels, plan.total_need, stopped_groups)
+        scheduler = UpgradeScheduler(plan.levels, self.calculate_normalized_level, self.upgrade_groups, stopped_groups)
+        need = list(plan.total_need)
+        
+        while True:
+            # 取出归一化等级最小的组及组内等级最低的槽位
+            next_upgrade = scheduler.peek()
+            if next_upgrade is None:
+                # 所有组都已升到最终等级
+                break
+            
+            group_idx, slot, level = next_upgrade
+            if slot is None:
+                # 这一组没有任何项目
+                scheduler.drop_group()
+                continue
+            
+            kind = self.upgrade_groups[group_idx][0]
+            step_cost = cost_indexes[kind].range_cost(level, level + 1)
+            if level >= final_levels[group_idx][slot]:
+                # 已升到最终等级；不是满级说明下一级积分不足，记下来以便积分增加时从这里续算
+                if level < cost_indexes[kind].max_level:
+                    drop_need = list(need)
+                    for i, cost in enumerate(step_cost):
+                        drop_need[material_offsets[kind] + i] += cost
+                    plan.drops.append((len(plan.step_groups), group_idx, tuple(drop_need)))
+                scheduler.drop_group()
+                continue
+            
+            for i, cost in enumerate(step_cost):
+                need[material_offsets[kind] + i] += cost
+            plan.add_step(group_idx, slot, level, tuple(need))
+            
+            # 更新目标等级，O(log n) 调整优先队列
+            scheduler.advance()
+            
+            if len(plan.step_groups) % PLAN_PROGRESS_STEPS == 0:
+                yield self.get_plan_progress(plan)
+        
+        yield self.get_plan_progress(plan)
+    
+    def build_plan_result(self, plan):
+        """把规划整理成展示用的结果：最终等级、材料消耗（库存先抵扣，不足部分兑换）和升级记录"""
+        weapon_current_nums, jade_current_nums, _, _ = self.prepare_level_state()
+        
+        # 初始化结果
+        result = {
+            "upgraded": False,
+            "weapon_targets": {},
+            "jade_targets": {},
+            "points_needed": 0,
+            "materials_to_buy": {},
+            "materials_used": {},
+            "materials_needed": {},
+            "points_left": self.current_points
+        }
+        
+        if not plan.step_groups:
+            return result
+        
+        # 数组状态写回按名称的目标等级
+        weapon_target_nums = weapon_current_nums.copy()
+        jade_target_nums = jade_current_nums.copy()
+        for kind, target_nums in ((WEAPON_KIND, weapon_target_nums), (JADE_KIND, jade_target_nums)):
+            for troop_idx in range(len(self.troops)):
+                for item_name, level in zip(plan.item_names[kind][troop_idx], plan.levels[kind][troop_idx]):
+                    target_nums[item_name] = level
+        
+        # 材料总需求、使用的库存、需要兑换的材料和剩余材料
+        total_need = plan.total_need
+        total_materials_needed = dict(zip(PLAN_MATERIALS, total_need))
+        materials_used = {
+            material: min(stock, need)
+            for material, stock, need in zip(PLAN_MATERIALS, self.material_stocks, total_need)
+        }
+        materials_to_buy = {
+            f"{material}_need_buy": max(0, need - stock)
+            for material, stock, need in zip(PLAN_MATERIALS, self.material_stocks, total_need)
+        }
+        materials_left = {
+            material: stock - materials_used[material]
+            for material, stock in zip(PLAN_MATERIALS, self.material_stocks)
+        }
+        total_points_used = self.calculate_need_points(total_need)
+        # 恰好用完时去掉浮点误差造成的负数
+        points_left = max(0, self.current_points - total_points_used)
+        
+        # 计算玉石百分比实际值
+        min_levels_final = self.get_min_levels(plan.levels)
+        troop_count = len(self.troops)
+        actual_percentages = tuple(
+            min_levels_final[troop_count + troop_idx] / min_levels_final[troop_idx] * 100 if min_levels_final[troop_idx] > 0 else 0
+            for troop_idx in range(troop_count)
+        )
+        
+        result = {
+            "upgraded": True,
+            "weapon_targets": weapon_target_nums,
+            "jade_targets": jade_target_nums,
+            "weapon_currents": weapon_current_nums,
+            "jade_currents": jade_current_nums,
+            "points_needed": total_points_used,
+            "materials_to_buy": materials_to_buy,
+            "materials_used": materials_used,
+            "materials_needed": total_materials_needed,
+            "materials_left": materials_left,
+            "points_left": points_left,
+            "group_min_levels": min_levels_final,
+            "actual_percentages": actual_percentages,
+            "upgrade_history": UpgradeHistory(plan, self.calculate_need_points)
+        }
+        
+        return result
+
+
+def find_max_levels(inputs, plan=None):
+    """贪心推荐：返回最终等级、材料消耗和升级记录；传入 plan 时在上一次的规划上热启动（会修改 plan）"""
+    return AutoUpgradeCalculator(inputs).find_max_levels(plan)
+
+
+def iter_max_levels(inputs, plan):
+    """逐步规划到 plan 中，每升 PLAN_PROGRESS_STEPS 级产出一次进度，可以在任意一次进度之后停止"""
+    return AutoUpgradeCalculator(inputs).iter_max_levels(plan)
+
+
+def build_plan_result(inputs, plan):
+    """把（可能只规划了一部分的）plan 整理成与 find_max_levels 相同格式的结果"""
+    return AutoUpgradeCalculator(inputs).build_plan_result(plan)
+
+
+def find_exact_levels(inputs, time_limit, cancel_event=None):
+    """精确模式推荐（分支定界），超过 time_limit 秒或 cancel_event 被设置时返回已找到的最好方案"""
+    return AutoUpgradeCalculator(inputs).find_exact_levels(time_limit, cancel_event)